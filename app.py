@@ -1,24 +1,34 @@
 # app.py
+import multiprocessing
 import os
+import subprocess
+import sys
+import time
 from pathlib import Path
 import tkinter as tk
 from tkinter import ttk, messagebox
 import ttkbootstrap as tb
 from datetime import date
+from typing import TYPE_CHECKING
 
-from db import init_db
+from db import init_db, close_conn
+from reminders import SOON_DAYS
 from ui.theme import apply_theme
+from ui.lazy import LazyTab
+from ui import async_loader
 
-# Pestañas / módulos principales
+# Pestañas: solo el inicio se importa ya; el resto (y sus dependencias)
+# se importa al abrir su pestaña
 from ui.dashboard import DashboardFrame
-from ui.animals import AnimalsFrame
-from ui.sponsors import SponsorsFrame
-from ui.donations import DonationsFrame
-from ui.health import HealthFrame
-from ui.adoptions import AdoptionsFrame
-from ui.reports import ReportsFrame
+
+if TYPE_CHECKING:  # nunca corre: deja las pestañas a la vista de PyInstaller
+    import ui.animals, ui.sponsors, ui.donations, ui.health, ui.adoptions, ui.reports  # noqa: F401
 
 APP_TITLE = "AlbergueApp"
+STARTUP_BUDGET_MS = 1500  # tiempo máximo esperado hasta el primer pintado
+IMPORT_BUDGET_MS = 600    # importar app (sin abrir ventana)
+# Se importan al usarlos (pestaña, primer gráfico, primera exportación), nunca al arrancar
+HEAVY_MODULES = ("pandas", "matplotlib", "numpy", "reportlab", "weasyprint", "xhtml2pdf")
 
 
 # ----------------- Utilidades de ventana -----------------
@@ -79,7 +89,9 @@ def toggle_fullscreen(win: tk.Tk, on: bool | None = None):
 
 
 def on_tab_changed(event):
-    """Si el tab activo tiene .refresh(), lo llama automáticamente."""
+    """Si el tab activo tiene .refresh(), lo llama automáticamente.
+    Un fallo (p. ej. al construir una pestaña diferida) se avisa con un
+    mensaje en vez de romper toda la UI."""
     nb: ttk.Notebook = event.widget
     sel = nb.select()
     if not sel:
@@ -88,9 +100,9 @@ def on_tab_changed(event):
     if hasattr(frame, "refresh"):
         try:
             frame.refresh()
-        except Exception:
-            # Evita que un fallo en refresh rompa toda la UI
-            pass
+        except Exception as e:
+            messagebox.showerror(nb.tab(sel, "text") or APP_TITLE,
+                                 f"No fue posible abrir la pestaña:\n{e}")
 
 
 def center_on_screen(win: tk.Tk, width: int, height: int):
@@ -103,8 +115,103 @@ def center_on_screen(win: tk.Tk, width: int, height: int):
     win.geometry(f"{width}x{height}+{x}+{y}")
 
 
+def measure_startup(win: tk.Tk, t0: float) -> float:
+    """Milisegundos desde `t0` hasta que la ventana quedó pintada (procesa
+    los eventos pendientes). Se compara con STARTUP_BUDGET_MS en los tests."""
+    win.update()
+    return (time.perf_counter() - t0) * 1000
+
+
+def import_times(module: str = "app") -> dict[str, float]:
+    """Milisegundos acumulados de cada módulo al importar `module` en un
+    proceso nuevo (salida de `python -X importtime`). El total es el valor
+    de `module`; sirve para comprobar IMPORT_BUDGET_MS y HEAVY_MODULES."""
+    err = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root(), capture_output=True, text=True, check=True,
+    ).stderr
+    times = {}
+    for line in err.splitlines():
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            times[parts[2].strip()] = int(parts[1]) / 1000
+    return times
+
+
+def heavy_imports(times: dict[str, float]) -> list[str]:
+    """Paquetes de HEAVY_MODULES que aparecen en `times` (import_times())."""
+    return sorted({n.split(".")[0] for n in times} & set(HEAVY_MODULES))
+
+
+def report_import_times(top: int = 15):
+    """`python app.py --importtime`: lo que más tarda y si se cumple el presupuesto."""
+    times = import_times()
+    for name, ms in sorted(times.items(), key=lambda kv: -kv[1])[:top]:
+        print(f"{ms:8.1f} ms  {name}")
+    total = times.get("app", 0.0)
+    print(f"Total: {total:.0f} ms (presupuesto {IMPORT_BUDGET_MS} ms)")
+    heavy = heavy_imports(times)
+    if heavy:
+        print("Importados al arrancar (deberían cargarse al usarse):", ", ".join(heavy))
+
+
+def health_reminder(upcoming):
+    """Aviso (una sola vez al inicio, con nombres) de dosis vencidas o en
+    ≤7 días. `upcoming` son los pendientes del dashboard (reminders.due)."""
+    today = date.today()
+    late = [r for r in upcoming if r.status(today) == "late"]
+    soon = [r for r in upcoming if r.status(today) == "soon"]
+    if not late and not soon:
+        return
+    # Solo nombres válidos (sin números ni vacíos)
+    nombres = sorted({r.animal for r in late + soon if r.animal and not str(r.animal).isdigit()})
+    lista = "\n - " + "\n - ".join(nombres[:15])  # máximo 15 nombres visibles
+    if len(nombres) > 15:
+        lista += "\n..."
+    partes = []
+    if late:
+        partes.append(f"{len(late)} vencidas")
+    if soon:
+        partes.append(f"{len(soon)} próximas en ≤{SOON_DAYS} días")
+    messagebox.showinfo(
+        "Recordatorio de salud",
+        f"Tienes aplicaciones (vacunas/desparas) {' y '.join(partes)}.\n\nAnimales:{lista}"
+    )
+
+
+def build_tabs(win: tk.Tk) -> ttk.Notebook:
+    """Contenedor de pestañas de la ventana principal."""
+    nb = ttk.Notebook(win)
+    nb.pack(fill="both", expand=True)
+
+    # Solo el inicio se construye ya; el resto al seleccionar su pestaña
+    # el aviso de salud sale de la primera carga del dashboard (en segundo plano)
+    home      = DashboardFrame(nb, on_first_load=lambda data: health_reminder(data["pending"]))
+    animals   = LazyTab(nb, "ui.animals:AnimalsFrame")
+    sponsors  = LazyTab(nb, "ui.sponsors:SponsorsFrame")
+    donations = LazyTab(nb, "ui.donations:DonationsFrame")
+    health    = LazyTab(nb, "ui.health:HealthFrame")
+    adoptions = LazyTab(nb, "ui.adoptions:AdoptionsFrame")
+    reports   = LazyTab(nb, "ui.reports:ReportsFrame")
+
+    # Pestañas del sistema
+    nb.add(home, text="Inicio")
+    nb.add(animals, text="Animales")
+    nb.add(sponsors, text="Padrinos")
+    nb.add(donations, text="Donaciones")
+    nb.add(health, text="Vacunas/Despar.")
+    nb.add(adoptions, text="Adopciones")
+    nb.add(reports, text="Reportes")
+
+    # Auto-refresh al cambiar de pestaña
+    nb.bind("<<NotebookTabChanged>>", on_tab_changed)
+    return nb
+
+
 # ----------------- Main -----------------
 def main():
+    t0 = time.perf_counter()
+
     # Mejora de nitidez en Windows
     enable_windows_hidpi()
 
@@ -129,52 +236,19 @@ def main():
     app.bind("<Escape>", lambda e: toggle_fullscreen(app, False))
 
     # Contenedor de pestañas
-    nb = ttk.Notebook(app)
-    nb.pack(fill="both", expand=True)
-
-    # Instancia de cada módulo
-    home      = DashboardFrame(nb)
-    animals   = AnimalsFrame(nb)
-    sponsors  = SponsorsFrame(nb)
-    donations = DonationsFrame(nb)
-    health    = HealthFrame(nb)
-    adoptions = AdoptionsFrame(nb)
-    reports   = ReportsFrame(nb)
-
-    # --- Notificación de salud (una sola vez al inicio, con nombres) ---
-    try:
-        upcoming = home._pending(30)
-        today = date.today()
-        soon = [r for r in upcoming if (r[2] - today).days <= 7]
-        if soon:
-            # Solo nombres válidos (sin números ni vacíos)
-            nombres = sorted({r[1] for r in soon if r[1] and not str(r[1]).isdigit()})
-            lista = "\n - " + "\n - ".join(nombres[:15])  # máximo 15 nombres visibles
-            if len(nombres) > 15:
-                lista += "\n..."
-            messagebox.showinfo(
-                "Recordatorio de salud",
-                f"Tienes {len(soon)} aplicaciones (vacunas/desparas) próximas en ≤7 días.\n\nAnimales:{lista}"
-            )
-    except Exception as e:
-        print("Aviso de salud no disponible:", e)
-
-
-    # Pestañas del sistema
-    nb.add(home, text="Inicio")
-    nb.add(animals, text="Animales")
-    nb.add(sponsors, text="Padrinos")
-    nb.add(donations, text="Donaciones")
-    nb.add(health, text="Vacunas/Despar.")
-    nb.add(adoptions, text="Adopciones")
-    nb.add(reports, text="Reportes")
-
-    # Auto-refresh al cambiar de pestaña
-    nb.bind("<<NotebookTabChanged>>", on_tab_changed)
+    build_tabs(app)
 
     # Ejecutar aplicación
+    app.startup_ms = measure_startup(app, t0)
     app.mainloop()
+    async_loader.shutdown()
+    close_conn()
 
 
 if __name__ == "__main__":
-    main()
+    # el lote de fichas usa un pool de procesos (también en el .exe de PyInstaller)
+    multiprocessing.freeze_support()
+    if "--importtime" in sys.argv:
+        report_import_times()
+    else:
+        main()
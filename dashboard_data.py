@@ -0,0 +1,126 @@
+# dashboard_data.py
+"""Datos del dashboard: KPIs, pendientes de salud y series de los gráficos.
+
+Los KPIs salen de una sola consulta y los montos de donation_month, la
+tabla de totales por mes que mantienen los triggers (db._m007): leer un
+mes cuesta una fila sin importar cuántos años de donaciones haya. Todo se
+guarda en un VersionedCache: mientras no cambien las tablas el dashboard
+se redibuja con lo ya calculado, sin volver a consultar.
+
+Además el último snapshot se guarda en un JSON junto a la base: al abrir la
+app el dashboard se pinta con él al instante y después se revalida.
+"""
+import json
+import os
+from datetime import date
+
+import db
+import reminders
+from db import query, query_one, VersionedCache
+from reminders import Reminder
+
+HORIZONS = (6, 12, 24)   # meses que puede mostrar el gráfico de donaciones
+
+# donation_month cambia junto con donations (mismos triggers, misma transacción)
+KPI_TABLES = ("animals", "sponsors", "donations", "adoptions")
+PENDING_TABLES = reminders.TABLES
+TABLES = ("animals", "animal_types", "sponsors", "donations", "adoptions", "vaccines", "dewormings")
+
+_cache = VersionedCache()
+
+
+def month_start(d: date, back: int = 0) -> date:
+    """Primer día del mes de `d`, `back` meses atrás (negativo = adelante)."""
+    n = d.year * 12 + d.month - 1 - back
+    return date(n // 12, n % 12 + 1, 1)
+
+
+def kpis(today: date):
+    """(animales, padrinos, donado en el mes, adoptados, en proceso)."""
+    r = query_one("""
+        SELECT (SELECT COUNT(*) FROM animals) AS animales,
+               (SELECT COUNT(*) FROM sponsors) AS padrinos,
+               (SELECT total FROM donation_month WHERE mes = ?) AS don_mes,
+               (SELECT COUNT(*) FROM adoptions WHERE estado = 'ADOPTADO') AS adoptados,
+               (SELECT COUNT(*) FROM adoptions WHERE estado = 'EN_PROCESO') AS en_proceso
+    """, (f"{today:%Y-%m}",))
+    return r["animales"], r["padrinos"], r["don_mes"] or 0, r["adoptados"], r["en_proceso"]
+
+
+def donations_by_month(today: date, months: int = 6):
+    """(["AAAA-MM", ...], [total, ...]) de los últimos `months` meses,
+    incluido el actual; los meses sin donaciones van en 0."""
+    labels = [f"{month_start(today, i):%Y-%m}" for i in range(months - 1, -1, -1)]
+    rows = query("SELECT mes, total FROM donation_month WHERE mes BETWEEN ? AND ?",
+                 (labels[0], labels[-1]))
+    totals = {r["mes"]: float(r["total"] or 0) for r in rows}
+    return labels, [totals.get(lab, 0.0) for lab in labels]
+
+
+def animals_by_type():
+    rows = query("""
+        SELECT t.nombre AS tipo, COUNT(*) AS c
+        FROM animals a JOIN animal_types t ON t.id = a.especie_id
+        GROUP BY t.nombre ORDER BY c DESC
+    """)
+    return [r["tipo"] for r in rows], [r["c"] for r in rows]
+
+
+def snapshot(months: int = 6, charts: bool = True, today: date | None = None) -> dict:
+    """Todo lo que pinta el dashboard. Cada parte se cachea por separado
+    según sus tablas (y el día), así un cambio en salud no recalcula KPIs."""
+    today = today or date.today()
+    data = {
+        "kpis": _cache.get(("kpis", today), KPI_TABLES, lambda: kpis(today)),
+        "pending": _cache.get(("pending", today), PENDING_TABLES, lambda: reminders.due(today, 30)),
+        "months": months,
+    }
+    if charts:
+        data["donaciones"] = _cache.get(("donaciones", today, months), ("donations",),
+                                        lambda: donations_by_month(today, months))
+        data["tipos"] = _cache.get("tipos", ("animals", "animal_types"), animals_by_type)
+    return data
+
+
+# ----------------- Snapshot en disco -----------------
+SNAPSHOT_NAME = "dashboard_snapshot.json"
+_saved = None  # último snapshot escrito por este proceso
+
+
+def snapshot_path():
+    return db.DB_PATH.with_name(SNAPSHOT_NAME)
+
+
+def save_snapshot(data: dict):
+    """Guarda `data` (de snapshot()) si cambió; escribe aparte y reemplaza,
+    así un corte a mitad de camino no deja un archivo roto."""
+    global _saved
+    if data == _saved:
+        return
+    doc = dict(data, pending=[(t, a, p, d.isoformat()) for t, a, p, d in data["pending"]])
+    path = snapshot_path()
+    tmp = path.with_suffix(".tmp")
+    try:
+        tmp.write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
+        _saved = data
+    except OSError:
+        pass  # sin snapshot el próximo arranque solo tarda un poco más
+
+
+def load_snapshot(months: int | None = None) -> dict | None:
+    """El último snapshot guardado, con la misma forma que snapshot(), o None.
+    Si se guardó con otro horizonte de meses se descartan los gráficos."""
+    try:
+        doc = json.loads(snapshot_path().read_text(encoding="utf-8"))
+        data = {
+            "kpis": tuple(doc["kpis"]),
+            "pending": [Reminder(t, a, p, date.fromisoformat(d)) for t, a, p, d in doc["pending"]],
+            "months": doc["months"],
+        }
+        if "donaciones" in doc and (months is None or doc["months"] == months):
+            data["donaciones"] = tuple(doc["donaciones"])
+            data["tipos"] = tuple(doc["tipos"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return data
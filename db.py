@@ -1,18 +1,216 @@
-
 import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import date, datetime
 from pathlib import Path
 
 DB_PATH = Path("albergue.db")
 
-def get_conn():
-    conn = sqlite3.connect(DB_PATH)
+# Ajustes aplicados una sola vez a cada conexión nueva
+PRAGMAS = (
+    ("journal_mode", "WAL"),       # lectores no bloquean al escritor
+    ("synchronous", "NORMAL"),     # seguro con WAL y mucho más rápido que FULL
+    ("cache_size", -16000),        # ~16 MB de caché de páginas
+    ("mmap_size", 134217728),      # 128 MB mapeados en memoria
+    ("temp_store", "MEMORY"),
+)
+STATEMENT_CACHE = 256  # sentencias preparadas que conserva cada conexión
+
+_local = threading.local()
+
+# Contador de escrituras por tabla (solo de este proceso); ver versions()
+_versions = {}
+_versions_lock = threading.Lock()
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, cached_statements=STATEMENT_CACHE)
     conn.row_factory = sqlite3.Row
+    for name, value in PRAGMAS:
+        conn.execute(f"PRAGMA {name}={value}")
     return conn
 
-def init_db():
+
+def get_conn():
+    """Conexión persistente del hilo actual (se abre una sola vez por hilo).
+    No se debe cerrar: la reutilizan todas las consultas del mismo hilo."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
+    return conn
+
+
+def close_conn():
+    """Cierra la conexión del hilo actual (p. ej. al salir de la app)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
+        try:
+            conn.execute("PRAGMA optimize")  # refresca estadísticas del planificador
+        except sqlite3.Error:
+            pass
+        conn.close()
+        _local.conn = None
+
+
+@contextmanager
+def transaction(*tables, immediate=False):
+    """Bloque de escritura: hace commit al salir o rollback si hay excepción.
+    `tables` son las tablas que se modifican: su versión sube al confirmar
+    (así las pantallas saben qué deben recargar).
+    Si ya hay una transacción abierta, se suma a ella.
+    immediate=True toma el lock de escritura desde el inicio."""
     conn = get_conn()
-    cur = conn.cursor()
+    if conn.in_transaction:
+        yield conn
+        bump(*tables)
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+    bump(*tables)
+
+
+def query(sql, params=()):
+    """Ejecuta un SELECT y devuelve todas las filas."""
+    return get_conn().execute(sql, params).fetchall()
+
+
+def query_one(sql, params=()):
+    """Ejecuta un SELECT y devuelve la primera fila (o None)."""
+    return get_conn().execute(sql, params).fetchone()
+
+
+# ----------------- Versiones de datos -----------------
+def bump(*tables):
+    """Marca tablas como modificadas (lo hace transaction() al confirmar)."""
+    with _versions_lock:
+        for t in tables:
+            _versions[t] = _versions.get(t, 0) + 1
+
+
+def versions(*tables):
+    """Huella del estado de `tables`: cambia si hubo escrituras desde este
+    proceso (contadores) o desde otro (PRAGMA data_version)."""
+    external = get_conn().execute("PRAGMA data_version").fetchone()[0]
+    with _versions_lock:
+        return (external,) + tuple(_versions.get(t, 0) for t in tables)
+
+
+class Freshness:
+    """Recuerda la versión de datos que ya muestra cada parte de una pantalla.
+    stale(key, *tables) devuelve True solo si algo cambió desde la última vez;
+    `key` puede incluir otros datos que afecten el resultado, p. ej. la fecha
+    de hoy. La versión leída ahí se da por vista recién con loaded(key), desde
+    el callback que pintó la carga: si la carga falla o se interrumpe, la
+    parte sigue vencida y el próximo refresh la vuelve a pedir."""
+
+    def __init__(self):
+        self._seen = {}
+        self._loading = {}   # key -> versión con que se pidió la carga
+
+    def stale(self, key, *tables):
+        current = versions(*tables)
+        if self._seen.get(key) == current:
+            return False
+        self._loading[key] = current
+        return True
+
+    def loaded(self, key):
+        """La carga pedida tras stale(key) ya está en pantalla."""
+        if key in self._loading:
+            self._seen[key] = self._loading.pop(key)
+
+    def mark(self, key, *tables):
+        """Da por vista la versión actual (la pantalla ya aplicó el cambio)."""
+        self._loading.pop(key, None)
+        self._seen[key] = versions(*tables)
+
+    def reset(self):
+        self._seen.clear()
+        self._loading.clear()
+
+
+class VersionedCache:
+    """Resultados compartidos por todo el proceso (entre hilos) que valen
+    mientras no cambien sus tablas. get(key, tables, load) devuelve el valor
+    guardado o llama `load()` si hubo escrituras: contadores de bump (este
+    proceso) o PRAGMA data_version (otro proceso). data_version es por
+    conexión, y cada hilo tiene la suya: se recuerda la última vista por
+    hilo, y un hilo que consulta por primera vez toma la suya como base."""
+
+    def __init__(self):
+        self._entries = {}   # key -> (contadores, {hilo: data_version}, valor)
+        self._lock = threading.Lock()
+
+    def get(self, key, tables, load):
+        ver = versions(*tables)
+        me = threading.get_ident()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                counters, external, value = entry
+                if counters == ver[1:] and external.setdefault(me, ver[0]) == ver[0]:
+                    return value
+            value = load()
+            self._entries[key] = (ver[1:], {me: ver[0]}, value)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# ----------------- Fechas -----------------
+# Todas las fechas se guardan como texto ISO 'AAAA-MM-DD' (o NULL si son
+# opcionales): así ordenan bien y los rangos usan los índices con BETWEEN.
+DATE_INPUT_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d", "%d/%m/%y",
+                      "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
 
+
+def parse_date(value, required=False):
+    """Normaliza una fecha a 'AAAA-MM-DD'. Vacío -> None (o ValueError si es
+    obligatoria). Lanza ValueError con un mensaje listo para mostrar."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = (value or "").strip()
+    if not text:
+        if required:
+            raise ValueError("La fecha es obligatoria.")
+        return None
+    for fmt in DATE_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Fecha inválida: '{text}' (use AAAA-MM-DD).")
+
+
+# Columnas de fecha: tabla -> [(columna, obligatoria, columna donde conservar
+# el texto original si no se puede interpretar)]
+DATE_COLUMNS = {
+    "animals":    [("ingreso_fecha", False, "notas")],
+    "donations":  [("fecha", True, None)],
+    "vaccines":   [("fecha_aplicacion", True, None), ("proxima_fecha", False, "notas")],
+    "dewormings": [("fecha_aplicacion", True, None), ("proxima_fecha", False, "notas")],
+    "adoptions":  [("fecha_egreso", False, "observaciones")],
+}
+
+
+# ----------------- Migraciones -----------------
+# Cada paso recibe un cursor dentro de la transacción de init_db().
+# El número de versión es la posición en MIGRATIONS (1, 2, ...) y se guarda
+# en PRAGMA user_version. NUNCA reordenar ni editar pasos ya publicados:
+# los cambios nuevos se agregan al final.
+
+def _m001_base_schema(cur):
+    """Tablas base (equivale al init_db original con IF NOT EXISTS,
+    así que es inocuo sobre bases creadas antes de las migraciones)."""
     # Tipos de animal
     cur.execute("""
     CREATE TABLE IF NOT EXISTS animal_types (
@@ -112,5 +310,241 @@ def init_db():
     )
     """)
 
-    conn.commit()
-    conn.close()
+
+def _m002_sponsors_notas(cur):
+    """Columna 'notas' en sponsors (antes la agregaba SponsorsFrame al abrirse)."""
+    cols = [c["name"] for c in cur.execute("PRAGMA table_info(sponsors)")]
+    if "notas" not in cols:
+        cur.execute("ALTER TABLE sponsors ADD COLUMN notas TEXT")
+
+
+def _m003_indexes(cur):
+    """Índices para claves foráneas y columnas de filtro/orden usadas por
+    las pantallas (JOINs de listados, KPIs del dashboard, ficha del animal,
+    pendientes de salud y combos ordenados por nombre)."""
+    for sql in (
+        # donaciones: por padrino / por animal (ficha, ordenadas por fecha) / por mes (KPIs)
+        "CREATE INDEX IF NOT EXISTS idx_donations_sponsor ON donations(sponsor_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_donations_animal ON donations(animal_id, fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_donations_fecha ON donations(fecha, monto)",
+        # salud: historial por animal y pendientes por próxima fecha
+        "CREATE INDEX IF NOT EXISTS idx_vaccines_animal ON vaccines(animal_id, fecha_aplicacion)",
+        "CREATE INDEX IF NOT EXISTS idx_vaccines_proxima ON vaccines(proxima_fecha)",
+        "CREATE INDEX IF NOT EXISTS idx_dewormings_animal ON dewormings(animal_id, fecha_aplicacion)",
+        "CREATE INDEX IF NOT EXISTS idx_dewormings_proxima ON dewormings(proxima_fecha)",
+        # adopciones: estado por animal (combos / ficha), por adoptante y conteo por estado
+        "CREATE INDEX IF NOT EXISTS idx_adoptions_animal ON adoptions(animal_id, estado)",
+        "CREATE INDEX IF NOT EXISTS idx_adoptions_adopter ON adoptions(adopter_id)",
+        "CREATE INDEX IF NOT EXISTS idx_adoptions_estado ON adoptions(estado)",
+        # animales por tipo (filtro y gráfico) y listas ordenadas por nombre
+        "CREATE INDEX IF NOT EXISTS idx_animals_especie ON animals(especie_id)",
+        "CREATE INDEX IF NOT EXISTS idx_animals_nombre ON animals(nombre)",
+        "CREATE INDEX IF NOT EXISTS idx_sponsors_nombre ON sponsors(nombre)",
+        "CREATE INDEX IF NOT EXISTS idx_adopters_nombre ON adopters(nombre)",
+    ):
+        cur.execute(sql)
+    cur.execute("ANALYZE")
+
+
+def _m004_iso_dates(cur):
+    """Normaliza las fechas existentes a ISO y agrega triggers que rechazan
+    fechas no canónicas en cualquier escritura posterior.
+    - Vacías -> NULL.
+    - Formatos conocidos (dd/mm/aaaa, etc.) -> AAAA-MM-DD.
+    - Texto irreconocible en columnas opcionales -> NULL, conservando el
+      valor original al final de las notas/observaciones del registro."""
+    for table, cols in DATE_COLUMNS.items():
+        for col, required, keep_in in cols:
+            rows = cur.execute(
+                f"SELECT id, {col} AS v FROM {table} WHERE {col} IS NOT NULL "
+                f"AND ({col} = '' OR date({col}, '+0 days') IS NOT {col})"
+            ).fetchall()
+            for r in rows:
+                try:
+                    iso = parse_date(r["v"])
+                except ValueError:
+                    if required or not keep_in:
+                        continue  # no se puede dejar NULL: se conserva tal cual
+                    cur.execute(
+                        f"UPDATE {table} SET {col}=NULL, "
+                        f"{keep_in}=TRIM(COALESCE({keep_in},'') || ' [{col}: ' || ? || ']') WHERE id=?",
+                        (r["v"], r["id"]),
+                    )
+                    continue
+                cur.execute(f"UPDATE {table} SET {col}=? WHERE id=?", (iso, r["id"]))
+
+        # date(x, '+0 days') devuelve x solo si x ya es una fecha ISO real
+        # (el modificador normaliza días fuera de rango como 2024-02-30)
+        checks = " OR ".join(
+            f"date(NEW.{col}, '+0 days') IS NOT NEW.{col}" if required
+            else f"(NEW.{col} IS NOT NULL AND date(NEW.{col}, '+0 days') IS NOT NEW.{col})"
+            for col, required, _ in cols
+        )
+        names = ", ".join(col for col, _, _ in cols)
+        for event, suffix in (("INSERT", "ins"), (f"UPDATE OF {names}", "upd")):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fechas_{suffix}
+            BEFORE {event} ON {table}
+            WHEN {checks}
+            BEGIN
+                SELECT RAISE(ABORT, 'Fecha inválida en {table} (use AAAA-MM-DD)');
+            END
+            """)
+
+
+def _m005_sort_indexes(cur):
+    """Índices (columna, id) para ordenar donaciones por encabezado con
+    paginación por clave: el orden de la vista sale directo del índice."""
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_donations_fecha_id ON donations(fecha, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_donations_monto ON donations(monto, id)")
+    cur.execute("ANALYZE donations")
+
+
+# Columnas de texto indexadas por tabla en {tabla}_fts (ver search.py)
+FTS_COLUMNS = {
+    "animals":   ("nombre", "notas"),
+    "sponsors":  ("nombre", "telefono", "correo", "notas"),
+    "adopters":  ("nombre", "documento", "telefono", "correo", "direccion"),
+    "adoptions": ("observaciones",),
+}
+
+
+def _m006_fts(cur):
+    """Índices de texto completo FTS5 (sin tildes ni mayúsculas) sobre las
+    columnas de FTS_COLUMNS. Son de contenido externo: guardan solo el
+    índice, y los triggers los mantienen al día en cada escritura.
+    Si este SQLite no trae FTS5 no se crean y la búsqueda usa LIKE."""
+    for table, cols in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        try:
+            cur.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                {", ".join(cols)},
+                content='{table}', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            )""")
+        except sqlite3.OperationalError:
+            return  # no such module: fts5
+        names = ", ".join(cols)
+        new = ", ".join(f"new.{c}" for c in cols)
+        old = ", ".join(f"old.{c}" for c in cols)
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_ins AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+        END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_del AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+        END""")
+        cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{fts}_upd AFTER UPDATE OF {names} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old});
+            INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new});
+        END""")
+        cur.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+# Totales de donaciones: tabla -> (columna clave, expresión sobre la fila de donations)
+DONATION_TOTALS = {
+    "donation_month":   ("mes", "strftime('%Y-%m', {r}.fecha)"),
+    "donation_sponsor": ("sponsor_id", "{r}.sponsor_id"),
+    "donation_animal":  ("animal_id", "{r}.animal_id"),
+}
+
+
+def rebuild_donation_totals(cur):
+    """Recalcula las tablas de totales desde donations (corrige cualquier
+    desvío acumulado; también se puede correr con `python db.py totales`)."""
+    for table, (col, expr) in DONATION_TOTALS.items():
+        key = expr.format(r="d")
+        cur.execute(f"DELETE FROM {table}")
+        cur.execute(f"""
+            INSERT INTO {table}({col}, total, n)
+            SELECT {key}, SUM(d.monto), COUNT(*) FROM donations d
+            WHERE {key} IS NOT NULL
+            GROUP BY {key}
+        """)
+
+
+def _m007_donation_totals(cur):
+    """Totales de donaciones por mes, por padrino y por animal, mantenidos por
+    triggers: el dashboard y la ficha leen una fila en vez de sumar todo el
+    historial. Una donación sin animal no suma en donation_animal."""
+    for table, (col, expr) in DONATION_TOTALS.items():
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {table} (
+            {col} {"TEXT" if col == "mes" else "INTEGER"} PRIMARY KEY,
+            total REAL NOT NULL,
+            n INTEGER NOT NULL
+        )""")
+        add = f"""
+            INSERT INTO {table}({col}, total, n)
+            SELECT {expr.format(r="new")}, new.monto, 1 WHERE {expr.format(r="new")} IS NOT NULL
+            ON CONFLICT({col}) DO UPDATE SET total = total + excluded.total, n = n + 1;"""
+        sub = f"""
+            UPDATE {table} SET total = total - old.monto, n = n - 1
+            WHERE {col} = {expr.format(r="old")};
+            DELETE FROM {table} WHERE {col} = {expr.format(r="old")} AND n <= 0;"""
+        for suffix, event, body in (
+            ("ins", "INSERT", add),
+            ("del", "DELETE", sub),
+            ("upd", "UPDATE OF fecha, sponsor_id, animal_id, monto", sub + add),
+        ):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_{suffix} AFTER {event} ON donations
+            BEGIN {body}
+            END""")
+    rebuild_donation_totals(cur)
+
+
+def _m008_last_dose_indexes(cur):
+    """Índices (animal, producto, aplicación) para saber cuál es la última
+    dosis de cada producto por animal (recordatorios, ver reminders.py).
+    El producto va sin mayúsculas: "Rabia" y "rabia" son la misma vacuna."""
+    for table, col in (("vaccines", "vacuna"), ("dewormings", "producto")):
+        cur.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{table}_ultima
+        ON {table}(animal_id, {col} COLLATE NOCASE, fecha_aplicacion)""")
+        cur.execute(f"ANALYZE {table}")
+
+
+MIGRATIONS = [
+    _m001_base_schema,
+    _m002_sponsors_notas,
+    _m003_indexes,
+    _m004_iso_dates,
+    _m005_sort_indexes,
+    _m006_fts,
+    _m007_donation_totals,
+    _m008_last_dose_indexes,
+]
+
+
+def schema_version():
+    return get_conn().execute("PRAGMA user_version").fetchone()[0]
+
+
+def init_db():
+    """Aplica solo las migraciones pendientes, todas en una transacción.
+    Con la base al día solo lee PRAGMA user_version."""
+    if schema_version() >= len(MIGRATIONS):
+        return
+    with transaction(immediate=True) as conn:
+        cur = conn.cursor()
+        # se relee dentro del lock por si otro proceso migró primero
+        current = cur.execute("PRAGMA user_version").fetchone()[0]
+        for step in MIGRATIONS[current:]:
+            step(cur)
+        cur.execute(f"PRAGMA user_version={len(MIGRATIONS)}")
+
+
+if __name__ == "__main__":
+    import sys
+
+    init_db()
+    if sys.argv[1:] == ["totales"]:
+        with transaction("donations", immediate=True) as conn:
+            rebuild_donation_totals(conn.cursor())
+        print("Totales de donaciones recalculados.")
+    else:
+        print("Uso: python db.py totales")
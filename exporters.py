@@ -0,0 +1,250 @@
+# exporters.py
+"""Exportación de reportes a archivo directo desde el cursor.
+
+Los exportadores corren en el pool: leen el reporte por bloques
+(reports_data.chunks) y escriben cada bloque apenas llega, así la memoria
+no depende del tamaño del reporte. Escriben a un archivo temporal que solo
+reemplaza al destino al terminar: si se cancela o falla no queda un
+archivo a medias.
+
+El avance y la cancelación van por un Progress compartido con la ventana
+(ver ui.busy), que lo lee desde el hilo de Tk.
+"""
+import csv
+import html
+import os
+import re
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import date
+
+from reports_data import count, chunks
+
+
+class Cancelled(Exception):
+    """El usuario canceló la exportación."""
+
+
+class Progress:
+    """Avance de un trabajo largo: el worker suma filas con step() y la
+    ventana lee done/total. cancel() hace que el próximo step() lance
+    Cancelled."""
+
+    def __init__(self):
+        self.done = 0
+        self.total = 0
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def fraction(self):
+        return min(1.0, self.done / self.total) if self.total else 0.0
+
+    def step(self, n=1):
+        if self._cancel.is_set():
+            raise Cancelled()
+        self.done += n
+
+
+@contextmanager
+def replacing(path):
+    """Ruta temporal junto a `path`; al salir sin error reemplaza el destino."""
+    tmp = f"{path}.part"
+    try:
+        yield tmp
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    os.replace(tmp, path)
+
+
+def write_csv(report, path, progress=None):
+    """CSV (UTF-8 con BOM, para que Excel lea bien las tildes) del reporte."""
+    progress = progress or Progress()
+    progress.total = count(report)
+    with replacing(path) as tmp, open(tmp, "w", newline="", encoding="utf-8-sig") as f:
+        out = csv.writer(f)
+        out.writerow(report.columns)
+        for rows in chunks(report):
+            progress.step(0)   # cancelar antes de escribir el bloque
+            out.writerows(rows)
+            progress.step(len(rows))
+    return progress.done
+
+
+# ----------------- Excel -----------------
+EXCEL_MAX_ROWS = 1_048_576   # filas por hoja (incluido el encabezado)
+_ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}$")
+
+
+def _column_formats(rows, ncols):
+    """Formato de cada columna según el primer bloque: fechas ISO -> fecha,
+    decimales -> monto, lo demás tal cual (None). Así no hace falta una
+    segunda pasada por los datos."""
+    formats = []
+    for i in range(ncols):
+        values = [r[i] for r in rows if r[i] not in (None, "")]
+        if values and all(isinstance(v, str) and _ISO_DATE.match(v) for v in values):
+            formats.append("yyyy-mm-dd")
+        elif values and all(isinstance(v, (int, float)) for v in values) \
+                and any(isinstance(v, float) for v in values):
+            formats.append("#,##0.00")
+        else:
+            formats.append(None)
+    return formats
+
+
+def _column_widths(columns, rows, formats):
+    widths = []
+    for i, c in enumerate(columns):
+        sample = max((len(str(r[i])) for r in rows if r[i] is not None), default=0)
+        if formats[i] == "#,##0.00":
+            sample += sample // 3 + 1   # separadores de miles
+        widths.append(min(60, max(len(str(c)), sample, 6) + 2))
+    return widths
+
+
+def write_excel(report, path, progress=None, title="Reporte"):
+    """Libro .xlsx en modo write_only: cada fila se escribe y se suelta, sin
+    armar el libro en memoria. Si el reporte no cabe en una hoja sigue en
+    "título (2)", "título (3)"…; anchos y formatos salen del primer bloque."""
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    progress = progress or Progress()
+    progress.total = count(report)
+    title = re.sub(r"[\\/*?:\[\]]", "-", title)[:25]   # nombres de hoja: máx. 31 caracteres
+    wb = Workbook(write_only=True)
+    ncols = len(report.columns)
+    formats = widths = None
+    ws = None
+    left = 0   # filas que aún caben en la hoja actual
+
+    def new_sheet():
+        n = len(wb.worksheets) + 1
+        sheet = wb.create_sheet(title if n == 1 else f"{title} ({n})")
+        for i, w in enumerate(widths, start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = w
+        sheet.freeze_panes = "A2"
+        sheet.append(list(report.columns))
+        return sheet
+
+    def cell(value, fmt):
+        if fmt is None or value in (None, ""):
+            return value
+        if fmt == "yyyy-mm-dd":
+            if not _ISO_DATE.match(str(value)):
+                return value   # texto que no es fecha: se deja como vino
+            value = date.fromisoformat(value)
+        c = WriteOnlyCell(ws, value)
+        c.number_format = fmt
+        return c
+
+    with replacing(path) as tmp:
+        for rows in chunks(report):
+            progress.step(0)
+            if formats is None:
+                formats = _column_formats(rows, ncols)
+                widths = _column_widths(report.columns, rows, formats)
+            plain = not any(formats)
+            for r in rows:
+                if left == 0:
+                    ws = new_sheet()
+                    left = EXCEL_MAX_ROWS - 1
+                ws.append(r if plain else [cell(v, f) for v, f in zip(r, formats)])
+                left -= 1
+            progress.step(len(rows))
+        if ws is None:   # reporte vacío: solo encabezados
+            widths = [len(str(c)) + 2 for c in report.columns]
+            new_sheet()
+        wb.save(tmp)
+    return progress.done
+
+
+# ----------------- PDF -----------------
+PDF_CHUNK_ROWS = 2000   # filas por documento parcial; las partes se unen con pypdf
+
+# plantilla de reports/templates por reporte (las demás usan base.html)
+PDF_TEMPLATES = {
+    "Animales": "animals_report.html",
+    "Donaciones": "donations_report.html",
+}
+
+
+def _html_table(columns, rows):
+    """Tabla con estilos por clase (no por celda); el encabezado va en
+    <thead> para que se repita en cada página (repeat="1" en xhtml2pdf)."""
+    out = ['<table repeat="1"><thead><tr>']
+    out.extend(f"<th>{html.escape(str(c))}</th>" for c in columns)
+    out.append("</tr></thead><tbody>")
+    for r in rows:
+        out.append("<tr>")
+        for v in r:
+            if v is None:
+                out.append("<td></td>")
+            elif isinstance(v, (int, float)):
+                out.append(f'<td class="num">{v}</td>')
+            else:
+                out.append(f"<td>{html.escape(str(v))}</td>")
+        out.append("</tr>")
+    out.append("</tbody></table>")
+    return "".join(out)
+
+
+def write_pdf(report, path, progress=None, title="Reporte"):
+    """PDF del reporte con su plantilla (PDF_TEMPLATES). Cada PDF_CHUNK_ROWS
+    filas se arma y se renderiza un documento aparte, y al final se unen: el
+    costo crece en línea con las filas y nunca hay un HTML gigante en memoria.
+    Título y datos van solo en la primera parte y el pie en la última
+    (secciones FIRST y LAST de la plantilla), así el PDF unido se lee como
+    un solo documento. Plantilla, CSS y backend salen ya preparados del
+    motor (ui.pdf_utils)."""
+    from ui.pdf_utils import get_engine
+
+    progress = progress or Progress()
+    progress.total = count(report)
+    engine = get_engine()
+    template = engine.template(PDF_TEMPLATES.get(title, "base.html"))
+    meta = f"Generado: {date.today().isoformat()} · {progress.total:,} filas".replace(",", ".")
+    tmpdir = tempfile.mkdtemp(prefix="albergue_pdf_")
+    parts = []
+    try:
+        blocks = chunks(report, PDF_CHUNK_ROWS)
+        rows = next(blocks, None)
+        while rows is not None:
+            progress.step(0)
+            following = next(blocks, None)   # para saber si este es el último
+            doc = template.render(TITLE=html.escape(title), META=meta,
+                                  TABLE=_html_table(report.columns, rows),
+                                  FIRST=not parts, LAST=following is None)
+            part = os.path.join(tmpdir, f"{len(parts):05d}.pdf")
+            engine.render(doc, part, template.css)
+            parts.append(part)
+            progress.step(len(rows))
+            rows = following
+        progress.step(0)
+        with replacing(path) as tmp:
+            if len(parts) == 1:
+                shutil.move(parts[0], tmp)
+            else:
+                from pypdf import PdfWriter
+
+                writer = PdfWriter()
+                for part in parts:
+                    writer.append(part)
+                with open(tmp, "wb") as f:
+                    writer.write(f)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return progress.done
@@ -0,0 +1,64 @@
+# lookups.py
+"""Listas id/nombre compartidas por todas las pantallas (combos y `_fmt`).
+
+Cada Lookup se carga una vez por proceso y se vuelve a leer solo cuando
+cambian sus tablas (ver db.VersionedCache).
+"""
+from db import query, VersionedCache
+
+_cache = VersionedCache()
+
+
+class _Data:
+    def __init__(self, rows):
+        self.items = [(r["id"], r["nombre"]) for r in rows]
+        self.names = dict(self.items)
+        self.labels = [f"{i} - {n}" for i, n in self.items]
+
+
+class Lookup:
+    """Lista (id, nombre) de una consulta, con vistas de diccionario y lista
+    ordenada. Se puede usar desde el hilo de Tk o desde el pool."""
+
+    def __init__(self, sql, *tables):
+        self.sql = sql
+        self.tables = tables
+
+    def _current(self):
+        return _cache.get(self.sql, self.tables, lambda: _Data(query(self.sql)))
+
+    def items(self):
+        """[(id, nombre)] en el orden de la consulta."""
+        return self._current().items
+
+    def names(self):
+        """{id: nombre}"""
+        return self._current().names
+
+    def labels(self):
+        """["id - nombre"] para los combos."""
+        return self._current().labels
+
+    def label(self, id_):
+        """"id - nombre" de un registro ("" si no hay id)."""
+        if not id_:
+            return ""
+        return f"{id_} - {self.names().get(id_, '')}"
+
+
+ANIMALS = Lookup("SELECT id, nombre FROM animals ORDER BY nombre", "animals")
+SPONSORS = Lookup("SELECT id, nombre FROM sponsors ORDER BY nombre", "sponsors")
+ADOPTERS = Lookup("SELECT id, nombre FROM adopters ORDER BY nombre", "adopters")
+TYPES = Lookup("SELECT id, nombre FROM animal_types ORDER BY nombre", "animal_types")
+
+# animales que aún se pueden dar en adopción
+AVAILABLE_ANIMALS = Lookup("""
+    SELECT a.id, a.nombre
+    FROM animals a
+    WHERE NOT EXISTS (
+        SELECT 1 FROM adoptions ad
+        WHERE ad.animal_id = a.id
+          AND UPPER(ad.estado) = 'ADOPTADO'
+    )
+    ORDER BY a.nombre
+""", "animals", "adoptions")
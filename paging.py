@@ -0,0 +1,261 @@
+# paging.py
+"""Paginación por clave (keyset) para los listados.
+
+En vez de OFFSET, cada página se pide con `(orden, id) < (clave)` sobre una
+columna indexada NOT NULL, así SQLite entra directo por el índice y lee solo
+las filas de la página. Para poder saltar a cualquier posición (barra de
+desplazamiento) se guardan "checkpoints": la clave de la primera fila de
+cada página, tomada de una pasada que solo recorre el índice.
+"""
+from collections import OrderedDict
+
+from db import query, query_one
+
+PAGE_SIZE = 200
+CACHED_PAGES = 16
+
+
+class Listing:
+    """Describe una consulta de listado paginable.
+
+    - select: columnas a mostrar (en el orden de la tabla)
+    - table: tabla base con alias, p. ej. "donations d"
+    - joins: JOINs que solo hacen falta para mostrar (no para filtrar)
+    - sorts: columna de la vista -> expresión SQL indexada y NOT NULL
+    - id_col: clave única de desempate (la PK de la tabla base)"""
+
+    def __init__(self, select, table, sorts, id_col, joins=""):
+        self.select = select
+        self.table = table
+        self.joins = joins
+        self.sorts = sorts
+        self.id_col = id_col
+
+    def order(self, sort, desc):
+        d = " DESC" if desc else ""
+        expr = self.sorts[sort]
+        if expr == self.id_col:
+            return f"{self.id_col}{d}"
+        return f"{expr}{d}, {self.id_col}{d}"
+
+    def seek(self, sort, desc, key, inclusive=True):
+        """Condición 'desde/después de esta clave' en el orden pedido."""
+        op = ("<" if desc else ">") + ("=" if inclusive else "")
+        expr = self.sorts[sort]
+        if expr == self.id_col:
+            return f"{self.id_col} {op} ?", (key[-1],)
+        return f"({expr}, {self.id_col}) {op} (?, ?)", tuple(key)
+
+    def key_cols(self, sort):
+        expr = self.sorts[sort]
+        return (self.id_col,) if expr == self.id_col else (expr, self.id_col)
+
+
+def page(listing, where="", params=(), sort="id", desc=True, after=None, limit=PAGE_SIZE):
+    """Una página del listado. `after` es la clave de la última fila de la
+    página anterior (None = primera página). Devuelve (filas, clave_siguiente);
+    la clave se arma con las últimas columnas de la fila (ver page_key)."""
+    clauses = _clauses(where)
+    args = list(params)
+    if after is not None:
+        cond, vals = listing.seek(sort, desc, after, inclusive=False)
+        clauses.append(cond)
+        args += vals
+    rows = _fetch(listing, clauses, args, sort, desc, limit)
+    nxt = page_key(listing, sort, rows[-1]) if len(rows) == limit else None
+    return rows, nxt
+
+
+def page_key(listing, sort, row):
+    """Clave (orden, id) de una fila pedida con _fetch (van al final)."""
+    n = len(listing.key_cols(sort))
+    return tuple(row)[-n:]
+
+
+def _clauses(where):
+    # los frames arman "WHERE a AND b"; aquí se combinan con la condición de la página
+    return [where[len("WHERE "):]] if where else []
+
+
+def _fetch(listing, clauses, args, sort, desc, limit):
+    where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+    keys = ", ".join(f"{c} AS _k{i}" for i, c in enumerate(listing.key_cols(sort)))
+    return query(f"""
+        SELECT {listing.select}, {keys}
+        FROM {listing.table} {listing.joins}
+        {where}
+        ORDER BY {listing.order(sort, desc)}
+        LIMIT ?
+    """, args + [limit])
+
+
+class KeysetSource:
+    """Fuente de filas para VirtualTable respaldada por SQLite.
+    Al crearla cuenta las filas y toma un checkpoint cada PAGE_SIZE (solo
+    índice, sin JOINs); después rows(start, stop) trae únicamente las páginas
+    que tocan esa ventana y guarda las últimas CACHED_PAGES en memoria.
+    Pensada para construirse en el AsyncLoader.
+
+    Una página va desde su checkpoint hasta el siguiente y recuerda cuántas
+    filas tiene; por eso insert/replace/pop (tras un alta, edición o baja)
+    solo ajustan ese contador y la página cacheada, sin volver a contar."""
+
+    def __init__(self, listing, where="", params=(), sort="id", desc=True, fmt=None):
+        self.listing = listing
+        self.where = where
+        self.params = tuple(params)
+        self.sort = sort
+        self.desc = desc
+        self._ncols = len(listing.key_cols(sort))
+        self._fmt = fmt or (lambda r: tuple(r)[:-self._ncols])
+        self._pages = OrderedDict()   # checkpoint -> filas de esa página
+        self.reload()
+
+    def reload(self):
+        """Vuelve a contar y a tomar checkpoints."""
+        lst = self.listing
+        cols = lst.key_cols(self.sort)
+        self._count = query_one(
+            f"SELECT COUNT(*) AS n FROM {lst.table} {self.where}", self.params)["n"]
+        sel = ", ".join(f"{c} AS _k{i}" for i, c in enumerate(cols))
+        outer = ", ".join(f"_k{i}" for i in range(len(cols)))
+        self._cps = [tuple(r) for r in query(f"""
+            SELECT {outer} FROM (
+                SELECT {sel}, row_number() OVER (ORDER BY {lst.order(self.sort, self.desc)}) AS _rn
+                FROM {lst.table} {self.where}
+            ) WHERE (_rn - 1) % {PAGE_SIZE} = 0
+        """, self.params)]
+        self._sizes = [PAGE_SIZE] * len(self._cps)
+        if self._sizes:
+            self._sizes[-1] = self._count - PAGE_SIZE * (len(self._cps) - 1)
+        self._pages.clear()
+        self.rows(0, PAGE_SIZE)  # primera página lista para pintar
+
+    def __len__(self):
+        return self._count
+
+    def rows(self, start, stop):
+        out = []
+        p, off = self._locate(start)
+        while p < len(self._cps) and len(out) < stop - start:
+            out.extend(self._page(p)[off:off + (stop - start - len(out))])
+            p, off = p + 1, 0
+        return [self._fmt(r) for r in out]
+
+    # ---------- cambios puntuales ----------
+    def fetch(self, id_):
+        """La fila `id_` con la forma del listado, o None si el filtro la excluye."""
+        clauses = _clauses(self.where) + [f"{self.listing.id_col} = ?"]
+        rows = _fetch(self.listing, clauses, list(self.params) + [id_], self.sort, self.desc, 1)
+        return rows[0] if rows else None
+
+    def insert(self, row):
+        """Agrega una fila ya guardada en su posición; devuelve su índice."""
+        k = self._key(row)
+        if not self._cps:
+            self._cps, self._sizes = [k], [1]
+            self._pages[k] = [row]
+            self._count = 1
+            return 0
+        p = self._page_for(k)
+        if p < 0:
+            # va antes del primer checkpoint: la página 0 pasa a empezar en ella
+            p = 0
+            old = self._cps[0]
+            self._cps[0] = k
+            if old in self._pages:
+                self._pages[k] = self._pages.pop(old)
+        cached = self._pages.get(self._cps[p])
+        self._sizes[p] += 1
+        self._count += 1
+        if cached is not None:
+            i = 0
+            while i < len(cached) and self._before(self._key(cached[i]), k):
+                i += 1
+            cached.insert(i, row)
+        page = self._page(p)  # si no estaba en caché ya la trae con la fila nueva
+        off = next(i for i, r in enumerate(page) if self._key(r) == k)
+        index = sum(self._sizes[:p]) + off
+        self._split(p)
+        return index
+
+    def pop(self, index):
+        """Quita la fila `index` (ya borrada en la base)."""
+        p, off = self._locate(index)
+        if p >= len(self._cps):
+            return
+        cached = self._pages.get(self._cps[p])
+        if cached is not None and off < len(cached):
+            del cached[off]
+        self._sizes[p] -= 1
+        self._count -= 1
+        # el checkpoint puede quedar apuntando a una fila borrada: como el seek
+        # es "desde esta clave", sigue sirviendo de límite
+        if self._sizes[p] == 0:
+            self._pages.pop(self._cps[p], None)
+            del self._cps[p], self._sizes[p]
+
+    def replace(self, index, row):
+        """Actualiza la fila `index` con `row` (None si ya no pasa el filtro).
+        Devuelve el índice nuevo (o None si salió de la vista)."""
+        p, off = self._locate(index)
+        cached = self._pages.get(self._cps[p]) if p < len(self._cps) else None
+        if (row is not None and cached is not None and off < len(cached)
+                and self._key(cached[off]) == self._key(row)):
+            cached[off] = row  # misma clave de orden: queda en su lugar
+            return index
+        self.pop(index)
+        return self.insert(row) if row is not None else None
+
+    # ---------- interno ----------
+    def _key(self, row):
+        return tuple(row)[-self._ncols:]
+
+    def _before(self, a, b):
+        """¿La clave `a` va antes que `b` en el orden de la vista?"""
+        return a > b if self.desc else a < b
+
+    def _page_for(self, k):
+        """Última página cuyo checkpoint no va después de `k` (-1 si ninguna)."""
+        lo, hi = 0, len(self._cps)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._before(k, self._cps[mid]):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo - 1
+
+    def _locate(self, index):
+        """(página, desplazamiento) de la fila absoluta `index`."""
+        for p, size in enumerate(self._sizes):
+            if index < size:
+                return p, index
+            index -= size
+        return len(self._sizes), 0
+
+    def _split(self, p):
+        # muchas altas seguidas en la misma página: se parte en dos
+        page = self._pages.get(self._cps[p])
+        if page is None or self._sizes[p] < 2 * PAGE_SIZE or len(page) != self._sizes[p]:
+            return
+        k = self._key(page[PAGE_SIZE])
+        self._pages[self._cps[p]] = page[:PAGE_SIZE]
+        self._pages[k] = page[PAGE_SIZE:]
+        self._cps.insert(p + 1, k)
+        self._sizes[p:p + 1] = [PAGE_SIZE, len(page) - PAGE_SIZE]
+
+    def _page(self, p):
+        cp = self._cps[p]
+        rows = self._pages.get(cp)
+        if rows is not None:
+            self._pages.move_to_end(cp)
+            return rows
+        clauses = _clauses(self.where)
+        cond, vals = self.listing.seek(self.sort, self.desc, cp)
+        rows = _fetch(self.listing, clauses + [cond], list(self.params) + list(vals),
+                      self.sort, self.desc, self._sizes[p])
+        self._pages[cp] = rows
+        if len(self._pages) > CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return rows
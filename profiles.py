@@ -0,0 +1,416 @@
+# profiles.py
+"""Ficha del animal en PDF: datos, HTML y exportación en lote.
+
+fetch() trae los datos de muchos animales con una consulta por tabla (no
+cinco por animal) y export_batch() renderiza las fichas en un pool de
+procesos: el render de PDF es CPU puro y con hilos no se paraleliza.
+La salida es una carpeta con un PDF por animal o un solo PDF con índice.
+"""
+import html as _html
+import json
+import os
+import re
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from datetime import date
+from multiprocessing import get_context
+
+from db import query
+from exporters import replacing
+from ui.pdf_utils import get_engine
+
+DONATIONS_SHOWN = 10   # donaciones que se listan en la ficha (el total las cuenta todas)
+PREFETCH = 200         # animales por bloque de consultas en el lote
+PROCESSES = max(1, min(4, (os.cpu_count() or 2) - 1))
+
+# hoja de estilos de la ficha: fija, el motor la parsea una sola vez
+PROFILE_CSS = """
+@page { size:A4; margin: 18mm 16mm; }
+body { font-family:'Segoe UI', Arial, sans-serif; color:#0f172a; }
+h1 { margin:0; font-size:20pt; }
+h2 { margin:0 0 6px; font-size:12.5pt; color:#334155; }
+.small { font-size:9pt; } .muted { color:#64748B; }
+
+.header {
+display:flex; justify-content:space-between; align-items:center;
+border-bottom:1px solid #E5E7EB; padding-bottom:6mm; margin-bottom:8mm;
+}
+.badge {
+display:inline-block; background:#2563eb; color:#fff; font-weight:700;
+padding:4px 12px; border-radius:999px; font-size:10.5pt; letter-spacing:.2px;
+}
+
+.badge.adoptado { background:#16a34a; }
+.badge.proceso { background:#f59e0b; }
+
+.kchips { display:flex; gap:8px; margin-top:6px; flex-wrap:wrap; }
+.chip {
+display:inline-block; background:#F1F5F9; border:1px solid #E5E7EB;
+padding:4px 10px; border-radius:999px; font-size:9.5pt;
+}
+
+.grid2 { display:grid; grid-template-columns:1.1fr 0.9fr; gap:9mm; }
+.card {
+border:1px solid #E5EAF2; border-radius:10px; padding:7mm; background:#fff;
+}
+table { width:100%; border-collapse:collapse; }
+th,td { border:1px solid #E5EAF2; padding:6px 8px; font-size:10pt; }
+th { background:#F2F6FB; text-align:left; }
+
+.zebra tr:nth-child(even) td { background:#fafbff; }
+
+.section-title {
+font-variant:all-small-caps; letter-spacing:.8px; color:#475569;
+font-weight:700; margin:10mm 0 4mm;
+}
+
+.kv table { border:0; }
+.kv th,.kv td { border:0; padding:3px 0; }
+.kv th { width:35%; color:#64748B; background:transparent; }
+
+.footer { margin-top:10mm; text-align:center; }
+"""
+
+# animales que siguen en el albergue (sin adopción concretada)
+IN_SHELTER = """NOT EXISTS (
+    SELECT 1 FROM adoptions ad
+    WHERE ad.animal_id = a.id AND UPPER(ad.estado) = 'ADOPTADO'
+)"""
+
+
+# ----------------- Datos -----------------
+def _by_animal(rows):
+    out = {}
+    for r in rows:
+        out.setdefault(r["animal_id"], []).append(dict(r))
+    return out
+
+
+def fetch(ids) -> dict:
+    """{id: ficha} para `ids`; cada ficha es un dict de dicts/listas (se
+    puede mandar a otro proceso). Los ids van como un arreglo JSON."""
+    ids_json = json.dumps([int(i) for i in ids])
+    in_ids = "IN (SELECT value FROM json_each(?))"
+
+    animals = query(f"""
+        SELECT a.id, a.nombre, t.nombre AS tipo, a.sexo, a.edad_meses, a.ingreso_fecha,
+            COALESCE(a.notas,'') AS notas
+        FROM animals a
+        JOIN animal_types t ON t.id=a.especie_id
+        WHERE a.id {in_ids}
+    """, (ids_json,))
+    vaccines = _by_animal(query(f"""
+        SELECT animal_id, vacuna, fecha_aplicacion,
+            COALESCE(proxima_fecha,'') AS proxima,
+            COALESCE(notas,'') AS notas
+        FROM vaccines
+        WHERE animal_id {in_ids}
+        ORDER BY animal_id, fecha_aplicacion DESC
+    """, (ids_json,)))
+    deworms = _by_animal(query(f"""
+        SELECT animal_id, producto, fecha_aplicacion,
+            COALESCE(proxima_fecha,'') AS proxima,
+            COALESCE(notas,'') AS notas
+        FROM dewormings
+        WHERE animal_id {in_ids}
+        ORDER BY animal_id, fecha_aplicacion DESC
+    """, (ids_json,)))
+    # las últimas DONATIONS_SHOWN de cada animal
+    donations = _by_animal(query(f"""
+        SELECT animal_id, fecha, padrino, monto, metodo, nota FROM (
+            SELECT d.animal_id, d.fecha, s.nombre AS padrino, d.monto,
+                COALESCE(d.metodo,'') AS metodo,
+                COALESCE(d.nota,'')   AS nota,
+                ROW_NUMBER() OVER (PARTITION BY d.animal_id ORDER BY d.fecha DESC) AS rn
+            FROM donations d
+            JOIN sponsors s ON s.id=d.sponsor_id
+            WHERE d.animal_id {in_ids}
+        ) WHERE rn <= ?
+        ORDER BY animal_id, rn
+    """, (ids_json, DONATIONS_SHOWN)))
+    # total y cantidad: una fila de la tabla de totales (db._m007)
+    totals = {r["animal_id"]: (float(r["total"]), r["n"]) for r in query(
+        f"SELECT animal_id, total, n FROM donation_animal WHERE animal_id {in_ids}", (ids_json,))}
+    # última adopción (define el estado)
+    adoptions = {r["animal_id"]: dict(r) for r in query(f"""
+        SELECT animal_id, estado, fecha_egreso, obs, adoptante FROM (
+            SELECT ad.animal_id, ad.estado,
+                COALESCE(ad.fecha_egreso,'') AS fecha_egreso,
+                COALESCE(ad.observaciones,'') AS obs,
+                ap.nombre AS adoptante,
+                ROW_NUMBER() OVER (PARTITION BY ad.animal_id ORDER BY ad.id DESC) AS rn
+            FROM adoptions ad
+            JOIN adopters ap ON ap.id = ad.adopter_id
+            WHERE ad.animal_id {in_ids}
+        ) WHERE rn = 1
+    """, (ids_json,))}
+
+    out = {}
+    for a in animals:
+        total, n = totals.get(a["id"], (0.0, 0))
+        out[a["id"]] = {
+            "animal": dict(a),
+            "vaccines": vaccines.get(a["id"], []),
+            "deworms": deworms.get(a["id"], []),
+            "donations": donations.get(a["id"], []),
+            "total_don": total,
+            "n_don": n,
+            "adoption": adoptions.get(a["id"]),
+        }
+    return out
+
+
+def file_name(animal, today=None) -> str:
+    today = today or date.today().isoformat()
+    nombre = re.sub(r'[\\/:*?"<>|]', "", (animal["nombre"] or "").replace(" ", "_"))
+    return f"ficha_{nombre}_{animal['id']}_{today}.pdf"
+
+
+# ----------------- HTML -----------------
+def default_logo() -> str:
+    uri = get_engine().logo_uri()   # base64, leído una vez por proceso
+    if uri:
+        return f"<img src='{uri}' style='height:34px'>"
+    return "<strong>AlbergueApp</strong>"
+
+
+def money(x):
+    try:
+        v = float(x or 0.0)
+        return f"{v:,.0f}".replace(",", ".")
+    except Exception:
+        return str(x or "0")
+
+
+def tr_safe(val):  # texto vacío en raya
+    return _html.escape(str(val)) if (val not in (None, "")) else "—"
+
+
+def profile_html(p, logo=None) -> str:
+    """HTML de la ficha `p` (un valor de fetch())."""
+    animal, adoption = p["animal"], p["adoption"]
+    vaccines, deworms, donations = p["vaccines"], p["deworms"], p["donations"]
+    total_don, n_don = p["total_don"], p["n_don"]
+    vacunas_cnt = len(vaccines)
+    deworm_cnt  = len(deworms)
+    limit_don = DONATIONS_SHOWN
+    today = date.today().isoformat()
+    logo_tag = logo or default_logo()
+
+    # === Estado ejecutivo (badge + color)
+    # Regla:
+    # - Si existe adopción y estado == 'ADOPTADO'  -> ADOPTADO (verde)
+    # - Si existe adopción y estado != 'ADOPTADO'  -> EN PROCESO (ámbar)
+    # - Si no hay adopción                           -> EN ALBERGUE (azul)
+    if adoption and (adoption["estado"] or "").upper() == "ADOPTADO":
+        estado_txt, estado_cls = "ADOPTADO", "adoptado"
+    elif adoption:
+        estado_txt, estado_cls = "EN PROCESO", "proceso"
+    else:
+        estado_txt, estado_cls = "EN ALBERGUE", "albergue"
+
+    # === HTML Ejecutivo (sin info repetida)
+    #   - Chips: Sexo / Edad / Ingreso
+    #   - Datos generales: solo Tipo + Notas
+    #   - Situación actual: estado/adoptante/egreso/obs (compacto)
+    #   - Donaciones: total + tabla (máx 10)
+    #   - Vacunas / Desparas: con contadores
+    return f"""<!DOCTYPE html><html lang="es"><meta charset="utf-8">
+    <body>
+
+    <div class="header">
+    <div style="display:flex; gap:10px; align-items:center;">{logo_tag}
+        <div style="margin-left:8px">
+        <div class="small muted">Ficha del animal</div>
+        <h1>{tr_safe(animal['nombre'])}</h1>
+        <div class="muted small">ID #{animal['id']} · {tr_safe(animal['tipo'])}</div>
+        <div class="kchips">
+            <span class="chip">Sexo: {tr_safe(animal['sexo'])}</span>
+            <span class="chip">Edad: {tr_safe(animal['edad_meses'])} meses</span>
+            <span class="chip">Ingreso: {tr_safe(animal['ingreso_fecha'])}</span>
+        </div>
+        </div>
+    </div>
+    <div class="badge {estado_cls}">{estado_txt}</div>
+    </div>
+
+    <div class="grid2">
+    <div class="card">
+        <h2>Datos generales</h2>
+        <div class="kv">
+        <table>
+            <tr><th>Tipo</th><td>{tr_safe(animal['tipo'])}</td></tr>
+            <tr><th>Notas</th><td>{tr_safe(animal['notas'])}</td></tr>
+        </table>
+        </div>
+    </div>
+
+    <div class="card">
+        <h2>Situación actual</h2>
+        <table>
+        <tr><th>Estado</th><td>{estado_txt}</td></tr>
+        <tr><th>Adoptante</th><td>{tr_safe(adoption['adoptante'] if adoption else '')}</td></tr>
+        <tr><th>Fecha de egreso</th><td>{tr_safe(adoption['fecha_egreso'] if adoption else '')}</td></tr>
+        <tr><th>Observaciones</th><td>{tr_safe(adoption['obs'] if adoption else '')}</td></tr>
+        </table>
+    </div>
+    </div>
+
+    <div class="section-title">Historial sanitario</div>
+    <div class="grid2">
+    <div class="card">
+        <h2>Vacunas ({vacunas_cnt})</h2>
+        <table class="zebra">
+        <tr><th>Vacuna</th><th>Aplicación</th><th>Próxima</th><th>Notas</th></tr>
+        {''.join([f"<tr><td>{tr_safe(v['vacuna'])}</td><td>{tr_safe(v['fecha_aplicacion'])}</td><td>{tr_safe(v['proxima'])}</td><td>{tr_safe(v['notas'])}</td></tr>" for v in vaccines]) or "<tr><td colspan='4' class='small muted'>Sin registros</td></tr>"}
+        </table>
+    </div>
+
+    <div class="card">
+        <h2>Desparasitaciones ({deworm_cnt})</h2>
+        <table class="zebra">
+        <tr><th>Producto</th><th>Aplicación</th><th>Próxima</th><th>Notas</th></tr>
+        {''.join([f"<tr><td>{tr_safe(d['producto'])}</td><td>{tr_safe(d['fecha_aplicacion'])}</td><td>{tr_safe(d['proxima'])}</td><td>{tr_safe(d['notas'])}</td></tr>" for d in deworms]) or "<tr><td colspan='4' class='small muted'>Sin registros</td></tr>"}
+        </table>
+    </div>
+    </div>
+
+    <div class="section-title">Apoyo económico</div>
+    <div class="card">
+    <div class="small muted" style="margin-bottom:6px">Total donado a este animal</div>
+    <div style="font-size:18pt; font-weight:800; margin-bottom:8px">{money(total_don)}</div>
+
+    <table class="zebra">
+        <tr><th>Fecha</th><th>Padrino</th><th>Monto</th><th>Método</th><th>Nota</th></tr>
+        {''.join([f"<tr><td>{tr_safe(d['fecha'])}</td><td>{tr_safe(d['padrino'])}</td><td>{money(d['monto'])}</td><td>{tr_safe(d['metodo'])}</td><td>{tr_safe(d['nota'])}</td></tr>" for d in donations]) or "<tr><td colspan='5' class='small muted'>Sin registros</td></tr>"}
+    </table>
+    {"<div class='small muted' style='margin-top:6px'>Mostrando las últimas " + str(limit_don) + " donaciones</div>" if n_don > limit_don else ""}
+    </div>
+
+    <div class="footer small muted">Generado por AlbergueApp · {today}</div>
+
+    </body></html>"""
+
+
+# ----------------- Lote -----------------
+def ids_for(listing, where="", params=(), in_shelter=False):
+    """Ids (por nombre) de los animales de un filtro de la pestaña Animales."""
+    if in_shelter:
+        where = f"{where} AND {IN_SHELTER}" if where else f"WHERE {IN_SHELTER}"
+    rows = query(f"SELECT {listing.id_col} AS id FROM {listing.table} {listing.joins} {where}"
+                 f" ORDER BY a.nombre, a.id", params)
+    return [r["id"] for r in rows]
+
+
+def _render(job):
+    """Corre en un proceso del pool: (html, ruta, css) -> ruta. El motor del
+    proceso queda armado para las fichas siguientes."""
+    html, path, css = job
+    get_engine().render(html, path, css)
+    return path
+
+
+def _pdf_pages(path):
+    from pypdf import PdfReader
+
+    return len(PdfReader(path).pages)
+
+
+TOC_CSS = """
+@page { size:A4; margin: 18mm 16mm; }
+body { font-family:'Segoe UI', Arial, sans-serif; color:#0f172a; }
+h1 { font-size:18pt; margin:0 0 6mm; }
+table { width:100%; border-collapse:collapse; font-size:10pt; }
+thead { display:table-header-group; }
+th,td { border-bottom:1px solid #E5EAF2; padding:4px 6px; text-align:left; }
+.num { text-align:right; }
+"""
+
+
+def _toc_html(entries, offset):
+    """Índice: (nombre, id, primera página de su ficha sin contar el índice)."""
+    rows = "".join(
+        f"<tr><td>{tr_safe(nombre)}</td><td>#{id_}</td><td class='num'>{page + offset}</td></tr>"
+        for nombre, id_, page in entries
+    )
+    return f"""<!DOCTYPE html><html lang="es"><meta charset="utf-8">
+    <body>
+    <h1>Fichas de animales ({len(entries)})</h1>
+    <table repeat="1"><thead><tr><th>Animal</th><th>ID</th><th class="num">Página</th></tr></thead>
+    <tbody>{rows}</tbody></table>
+    <div style="margin-top:6mm; font-size:9pt; color:#64748B">Generado por AlbergueApp · {date.today().isoformat()}</div>
+    </body></html>"""
+
+
+def export_batch(ids, out, progress, merged=False):
+    """Fichas PDF de `ids` en un pool de procesos.
+
+    merged=False: `out` es una carpeta y queda un PDF por animal.
+    merged=True: `out` es un PDF con índice (y marcadores) al inicio.
+    `progress` (exporters.Progress) avanza una vez por ficha; al cancelar
+    se descartan las pendientes y, si es un solo PDF, no se escribe nada."""
+    progress.total = len(ids)
+    today = date.today().isoformat()
+    logo = default_logo()
+    workdir = tempfile.mkdtemp(prefix="albergue_fichas_") if merged else out
+    done = {}   # id -> ruta del PDF
+    names = {}
+    ex = ProcessPoolExecutor(PROCESSES, mp_context=get_context("spawn"))
+    try:
+        pending = {}
+        for start in range(0, len(ids), PREFETCH):
+            block = ids[start:start + PREFETCH]
+            for id_, p in fetch(block).items():
+                names[id_] = p["animal"]["nombre"]
+                path = os.path.join(workdir, file_name(p["animal"], today))
+                pending[ex.submit(_render, (profile_html(p, logo), path, PROFILE_CSS))] = id_
+                # no más de dos fichas en cola por proceso: la memoria no crece con el lote
+                while len(pending) >= 2 * PROCESSES:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        done[pending.pop(fut)] = fut.result()
+                        progress.step(1)
+        for fut in list(pending):
+            progress.step(0)
+            done[pending.pop(fut)] = fut.result()
+            progress.step(1)
+        progress.step(0)
+        if merged:
+            _merge([(names[i], i, done[i]) for i in ids if i in done], out)
+    except BaseException:
+        ex.shutdown(wait=True, cancel_futures=True)
+        raise
+    finally:
+        ex.shutdown(wait=True)
+        if merged:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return len(done)
+
+
+def _merge(parts, out):
+    """Une las fichas [(nombre, id, ruta)] en `out`, con un índice al inicio
+    y un marcador por animal."""
+    from pypdf import PdfWriter
+
+    entries, page = [], 1
+    for nombre, id_, path in parts:
+        entries.append((nombre, id_, page))
+        page += _pdf_pages(path)
+
+    # el índice desplaza los números: se rehace si ocupa más páginas de lo supuesto
+    toc = os.path.join(os.path.dirname(parts[0][2]), "_indice.pdf")
+    toc_pages = 1
+    for _ in range(3):
+        _render((_toc_html(entries, toc_pages), toc, TOC_CSS))
+        actual = _pdf_pages(toc)
+        if actual == toc_pages:
+            break
+        toc_pages = actual
+
+    writer = PdfWriter()
+    writer.append(toc, outline_item="Índice")
+    for nombre, id_, path in parts:
+        writer.append(path, outline_item=f"{nombre} (#{id_})")
+    with replacing(out) as tmp, open(tmp, "wb") as f:
+        writer.write(f)
@@ -0,0 +1,68 @@
+# reminders.py
+"""Recordatorios de salud: dosis próximas y vencidas de vacunas y
+desparasitaciones.
+
+Solo cuenta la última aplicación de cada animal y producto: si a un animal
+ya se le puso otra vez la misma vacuna, la `proxima_fecha` de la dosis
+anterior quedó atrás y no debe avisar. Las consultas son rangos sobre
+idx_*_proxima y la "última dosis" se comprueba con idx_*_ultima
+(db._m008), así que el costo depende de la ventana, no del historial.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple
+
+from db import query
+
+OVERDUE_DAYS = 90   # vencidos que se siguen mostrando (más viejos se dan por perdidos)
+SOON_DAYS = 7       # "próximo" en los avisos y colores
+
+# tabla -> (columna del producto, etiqueta)
+KINDS = {
+    "vaccines":   ("vacuna", "Vacuna"),
+    "dewormings": ("producto", "Desparasitación"),
+}
+TABLES = ("vaccines", "dewormings", "animals")
+
+
+class Reminder(NamedTuple):
+    tipo: str       # "Vacuna" / "Desparasitación"
+    animal: str
+    producto: str
+    fecha: date     # próxima dosis
+
+    def days(self, today: date) -> int:
+        """Días que faltan (negativo = vencido hace tantos días)."""
+        return (self.fecha - today).days
+
+    def status(self, today: date) -> str:
+        """"late" (vencida), "soon" (≤SOON_DAYS) u "ok"."""
+        d = self.days(today)
+        return "late" if d < 0 else "soon" if d <= SOON_DAYS else "ok"
+
+
+def between(start: date, end: date) -> list[Reminder]:
+    """Últimas dosis con próxima fecha entre `start` y `end` (incluidos),
+    ordenadas por fecha."""
+    rows = []
+    for table, (col, label) in KINDS.items():
+        for r in query(f"""
+            SELECT a.nombre AS animal, t.{col} AS producto, t.proxima_fecha
+            FROM {table} t JOIN animals a ON a.id = t.animal_id
+            WHERE t.proxima_fecha BETWEEN ? AND ?
+              AND NOT EXISTS (
+                  SELECT 1 FROM {table} n
+                  WHERE n.animal_id = t.animal_id
+                    AND n.{col} = t.{col} COLLATE NOCASE
+                    AND (n.fecha_aplicacion > t.fecha_aplicacion
+                         OR (n.fecha_aplicacion = t.fecha_aplicacion AND n.id > t.id))
+              )
+        """, (start.isoformat(), end.isoformat())):
+            rows.append(Reminder(label, r["animal"], r["producto"],
+                                 date.fromisoformat(r["proxima_fecha"])))
+    rows.sort(key=lambda x: (x.fecha, x.animal or ""))
+    return rows
+
+
+def due(today: date, days: int = 30, overdue: int = OVERDUE_DAYS) -> list[Reminder]:
+    """Vencidas de los últimos `overdue` días y próximas hasta hoy+`days`."""
+    return between(today - timedelta(days=overdue), today + timedelta(days=days))
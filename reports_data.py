@@ -0,0 +1,153 @@
+# reports_data.py
+"""Consultas de la pestaña Reportes.
+
+Cada reporte es una consulta con sus encabezados. La tabla en pantalla lee
+solo las páginas visibles (ReportSource) y los exportadores la recorren por
+bloques con chunks(), así un reporte de millones de filas no pasa nunca
+completo por memoria.
+"""
+from collections import OrderedDict
+from typing import NamedTuple
+
+from db import get_conn, query_one
+from paging import PAGE_SIZE, CACHED_PAGES
+
+CHUNK_ROWS = 5000   # filas por fetchmany al exportar
+
+
+class Report(NamedTuple):
+    sql: str
+    columns: tuple
+    tables: tuple    # tablas que consulta (para saber cuándo recargarlo)
+
+
+REPORTS = {
+    "Animales": Report("""
+        SELECT a.id AS ID, a.nombre AS Nombre, t.nombre AS Tipo,
+               a.sexo AS Sexo, a.edad_meses AS "Edad(m)", a.ingreso_fecha AS Ingreso
+        FROM animals a JOIN animal_types t ON t.id=a.especie_id
+        ORDER BY a.id DESC
+    """, ("ID", "Nombre", "Tipo", "Sexo", "Edad(m)", "Ingreso"), ("animals", "animal_types")),
+
+    "Tipos de animal": Report(
+        "SELECT id AS ID, nombre AS Nombre FROM animal_types ORDER BY id DESC",
+        ("ID", "Nombre"), ("animal_types",)),
+
+    "Padrinos": Report("""
+        SELECT id AS ID, nombre AS Nombre,
+               COALESCE(telefono,'') AS Tel, COALESCE(correo,'') AS Correo
+        FROM sponsors ORDER BY id DESC
+    """, ("ID", "Nombre", "Tel", "Correo"), ("sponsors",)),
+
+    "Adoptantes": Report("""
+        SELECT id AS ID, nombre AS Nombre,
+               COALESCE(documento,'') AS Doc,
+               COALESCE(telefono,'')  AS Tel,
+               COALESCE(correo,'')    AS Correo
+        FROM adopters ORDER BY id DESC
+    """, ("ID", "Nombre", "Doc", "Tel", "Correo"), ("adopters",)),
+
+    "Donaciones": Report("""
+        SELECT d.id AS ID, d.fecha AS Fecha, s.nombre AS Padrino,
+               COALESCE(a.nombre,'') AS Animal, d.monto AS Monto, COALESCE(d.metodo,'') AS Método
+        FROM donations d
+        JOIN sponsors s ON s.id=d.sponsor_id
+        LEFT JOIN animals a ON a.id=d.animal_id
+        ORDER BY d.id DESC
+    """, ("ID", "Fecha", "Padrino", "Animal", "Monto", "Método"), ("donations", "sponsors", "animals")),
+
+    # totales ya agregados por los triggers (db._m007): una fila por padrino / mes
+    "Donaciones por padrino": Report("""
+        SELECT s.id AS ID, s.nombre AS Padrino, t.n AS Donaciones, t.total AS Total
+        FROM donation_sponsor t
+        JOIN sponsors s ON s.id=t.sponsor_id
+        ORDER BY t.total DESC
+    """, ("ID", "Padrino", "Donaciones", "Total"), ("donations", "sponsors")),
+
+    "Donaciones por mes": Report(
+        "SELECT mes AS Mes, n AS Donaciones, total AS Total FROM donation_month ORDER BY mes DESC",
+        ("Mes", "Donaciones", "Total"), ("donations",)),
+
+    "Adopciones": Report("""
+        SELECT ad.id AS ID, a.nombre AS Animal, ap.nombre AS Adoptante,
+               ad.estado AS Estado, COALESCE(ad.fecha_egreso,'') AS Egreso
+        FROM adoptions ad
+        JOIN animals a ON a.id=ad.animal_id
+        JOIN adopters ap ON ap.id=ad.adopter_id
+        ORDER BY ad.id DESC
+    """, ("ID", "Animal", "Adoptante", "Estado", "Egreso"), ("adoptions", "animals", "adopters")),
+}
+
+
+def count(report: Report) -> int:
+    return query_one(f"SELECT COUNT(*) FROM ({report.sql})")[0]
+
+
+def has_rows(report: Report) -> bool:
+    return query_one(f"SELECT EXISTS ({report.sql})")[0] == 1
+
+
+def chunks(report: Report, size: int = CHUNK_ROWS):
+    """Filas del reporte (tuplas) en listas de hasta `size`, con un cursor
+    propio: solo un bloque en memoria a la vez."""
+    cur = get_conn().cursor()
+    cur.row_factory = None
+    try:
+        cur.execute(report.sql)
+        while True:
+            rows = cur.fetchmany(size)
+            if not rows:
+                return
+            yield rows
+    finally:
+        cur.close()
+
+
+def _fetch(sql, params=()):
+    """Filas como tuplas (sin sqlite3.Row), con un cursor propio."""
+    cur = get_conn().cursor()
+    cur.row_factory = None
+    try:
+        return cur.execute(sql, params).fetchall()
+    finally:
+        cur.close()
+
+
+class ReportSource:
+    """Fuente de filas para VirtualTable sobre un reporte. Al crearla solo
+    cuenta las filas; rows(start, stop) trae con LIMIT/OFFSET las páginas
+    que tocan esa ventana y guarda las últimas CACHED_PAGES.
+    Se arma en el AsyncLoader y después la lee el hilo de Tk: por eso cada
+    página es una consulta aparte y no un cursor abierto (una conexión
+    sqlite3 no se comparte entre hilos). Los reportes no tienen una clave
+    de orden única e indexada como los listados (ver paging.KeysetSource)."""
+
+    def __init__(self, report: Report):
+        self.report = report
+        self._count = count(report)
+        self._pages = OrderedDict()
+        self.rows(0, PAGE_SIZE)   # primera página lista para pintar
+
+    def __len__(self):
+        return self._count
+
+    def rows(self, start, stop):
+        stop = min(stop, self._count)
+        if stop <= start:
+            return []
+        out = []
+        for p in range(start // PAGE_SIZE, (stop - 1) // PAGE_SIZE + 1):
+            base = p * PAGE_SIZE
+            out.extend(self._page(p)[max(0, start - base):stop - base])
+        return [tuple("" if v is None else v for v in r) for r in out]
+
+    def _page(self, p):
+        rows = self._pages.get(p)
+        if rows is not None:
+            self._pages.move_to_end(p)
+            return rows
+        rows = self._pages[p] = _fetch(f"{self.report.sql} LIMIT ? OFFSET ?",
+                                       (PAGE_SIZE, p * PAGE_SIZE))
+        if len(self._pages) > CACHED_PAGES:
+            self._pages.popitem(last=False)
+        return rows
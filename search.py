@@ -0,0 +1,54 @@
+# search.py
+"""Filtro de texto para los listados sobre los índices FTS5 ({tabla}_fts,
+ver db._m006_fts): cada palabra escrita se busca por prefijo, sin tildes
+ni mayúsculas, y los resultados se pueden ordenar por relevancia (bm25).
+Si la base no tiene FTS5 se cae a LIKE sobre las mismas columnas."""
+import re
+
+from db import query_one
+from paging import Listing
+
+_WORD = re.compile(r"\w+")
+_available = {}
+
+
+def has_fts(table) -> bool:
+    if table not in _available:
+        _available[table] = query_one(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (f"{table}_fts",)
+        ) is not None
+    return _available[table]
+
+
+def match_expr(text) -> str:
+    """'Ángel ma' -> '"Ángel"* "ma"*': todas las palabras, por prefijo."""
+    return " ".join(f'"{w}"*' for w in _WORD.findall(text))
+
+
+def ranked(listing, table):
+    """El listado unido a {table}_fts, con el orden extra "rank" (relevancia).
+    rank no tiene índice: sirve para resultados de búsqueda, no para toda la tabla.
+    CROSS JOIN fija el orden: primero las coincidencias del índice FTS y luego
+    cada fila por id. Con JOIN, si hay otro filtro indexado (p. ej. especie_id),
+    SQLite puede recorrer la tabla y evaluar MATCH fila por fila."""
+    fts = f"{table}_fts"
+    return Listing(
+        select=listing.select,
+        table=f"{fts} CROSS JOIN {listing.table} ON {fts}.rowid = {listing.id_col}",
+        joins=listing.joins,
+        sorts={**listing.sorts, "rank": f"{fts}.rank"},
+        id_col=listing.id_col,
+    )
+
+
+def text_filter(listing, table, text, like_cols):
+    """(listado, cláusula, params) para filtrar `listing` por `text`.
+    Con FTS5 el listado devuelto es el de ranked(); sin él, la cláusula es
+    un LIKE sobre `like_cols` y el listado no cambia. Sin palabras buscables
+    la cláusula es None."""
+    if not _WORD.search(text):
+        return listing, None, []
+    if has_fts(table):
+        return ranked(listing, table), f"{table}_fts MATCH ?", [match_expr(text)]
+    like = f"%{text}%"
+    return listing, "(" + " OR ".join(f"{c} LIKE ?" for c in like_cols) + ")", [like] * len(like_cols)
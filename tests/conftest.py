@@ -0,0 +1,35 @@
+# tests/conftest.py
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db  # noqa: E402
+import lookups  # noqa: E402
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    """Base vacía y migrada en un directorio temporal."""
+    db.close_conn()
+    monkeypatch.setattr(db, "DB_PATH", tmp_path / "albergue.db")
+    lookups._cache.clear()
+    db.init_db()
+    yield db
+    db.close_conn()
+    lookups._cache.clear()
+
+
+@pytest.fixture
+def tk_root():
+    """Ventana Tk oculta; se omite el test si no hay pantalla."""
+    tk = pytest.importorskip("tkinter")
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        pytest.skip("sin pantalla para Tk")
+    root.withdraw()
+    yield root
+    root.destroy()
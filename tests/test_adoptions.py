@@ -0,0 +1,18 @@
+# tests/test_adoptions.py
+from ui.adoptions import AdoptionsFrame
+
+
+def test_lookups_and_fmt_use_adopter_lookup(fresh_db):
+    with fresh_db.transaction("animals", "adopters") as conn:
+        conn.execute("INSERT INTO animal_types(nombre) VALUES ('Perro')")
+        conn.execute("INSERT INTO animals(nombre, especie_id) VALUES ('Luna', 1)")
+        conn.execute("INSERT INTO adopters(nombre) VALUES ('Juan Pérez')")
+
+    # no tocan widgets: se prueban sin armar el frame
+    animals, adopters = AdoptionsFrame._query_lookups(None)
+    assert "1 - Luna" in animals
+    assert "1 - Juan Pérez" in adopters
+
+    assert AdoptionsFrame._fmt(None, "adopters", 1) == "1 - Juan Pérez"
+    assert AdoptionsFrame._fmt(None, "animals", 1) == "1 - Luna"
+    assert AdoptionsFrame._fmt(None, "adopters", None) == ""
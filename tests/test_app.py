@@ -0,0 +1,45 @@
+# tests/test_app.py
+import time
+from types import SimpleNamespace
+
+import app
+
+
+class FakeNotebook:
+    """Lo justo de ttk.Notebook para on_tab_changed."""
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def select(self):
+        return ".tab"
+
+    def nametowidget(self, name):
+        return self.frame
+
+    def tab(self, tab_id, option):
+        return "Reportes"
+
+
+def test_tab_error_is_shown(monkeypatch):
+    def broken():
+        raise ImportError("No module named 'pandas'")
+
+    shown = []
+    monkeypatch.setattr(app.messagebox, "showerror", lambda *args: shown.append(args))
+    app.on_tab_changed(SimpleNamespace(widget=FakeNotebook(SimpleNamespace(refresh=broken))))
+    assert shown == [("Reportes", "No fue posible abrir la pestaña:\nNo module named 'pandas'")]
+
+
+def test_first_paint_within_budget(fresh_db, tk_root):
+    t0 = time.perf_counter()
+    app.build_tabs(tk_root)
+    ms = app.measure_startup(tk_root, t0)
+    assert 0 < ms < app.STARTUP_BUDGET_MS
+
+
+def test_cold_import_within_budget():
+    # proceso nuevo: lo que ya importó pytest no cuenta
+    times = app.import_times()
+    assert times["app"] < app.IMPORT_BUDGET_MS
+    assert app.heavy_imports(times) == []
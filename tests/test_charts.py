@@ -0,0 +1,12 @@
+# tests/test_charts.py
+from ui.charts import DashboardCharts, REQ_SIZE
+
+
+def test_requested_size_ignores_image(tk_root):
+    charts = DashboardCharts(tk_root)
+    charts.grid(row=0, column=0, sticky="nsew")
+    w, h = 900, 700
+    charts._blit(b"P6 %d %d 255\n" % (w, h) + bytes(w * h * 3))
+    tk_root.update_idletasks()
+    # el layout ve siempre el mismo pedido: la imagen no agranda la columna
+    assert (charts.winfo_reqwidth(), charts.winfo_reqheight()) == REQ_SIZE
@@ -0,0 +1,9 @@
+# tests/test_dashboard.py
+from ui.dashboard import DashboardFrame
+
+
+def test_query_all_takes_plain_months(fresh_db):
+    # corre en el pool: recibe los meses ya leídos, sin tocar variables Tk
+    data = DashboardFrame._query_all(12)
+    assert data["months"] == 12
+    assert data["kpis"] == (0, 0, 0, 0, 0)
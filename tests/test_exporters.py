@@ -0,0 +1,109 @@
+# tests/test_exporters.py
+import csv
+
+import pytest
+
+import exporters
+import reports_data
+from exporters import Cancelled, Progress
+from reports_data import REPORTS
+
+SPONSORS = REPORTS["Padrinos"]
+
+
+@pytest.fixture
+def sponsors(fresh_db, monkeypatch):
+    with fresh_db.transaction("sponsors") as conn:
+        conn.executemany("INSERT INTO sponsors(nombre, telefono) VALUES (?, ?)",
+                         [(f"Padrino {i}", None) for i in range(1, 8)]
+                         + [("José Peña", "300 123"), ('Ana "la, de siempre"', None)])
+    # bloques de 3 filas para que haya varios
+    monkeypatch.setattr(exporters, "chunks", lambda report, size=3: reports_data.chunks(report, size))
+    return fresh_db
+
+
+def test_csv_keeps_bom_and_rows(sponsors, tmp_path):
+    out = tmp_path / "padrinos.csv"
+    progress = Progress()
+    assert exporters.write_csv(SPONSORS, out, progress) == 9
+    assert (progress.done, progress.total, progress.fraction()) == (9, 9, 1.0)
+
+    assert out.read_bytes().startswith(b"\xef\xbb\xbf")   # Excel reconoce el UTF-8
+    with open(out, newline="", encoding="utf-8-sig") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == list(SPONSORS.columns)
+    assert rows[1] == ["9", 'Ana "la, de siempre"', "", ""]
+    assert rows[2] == ["8", "José Peña", "300 123", ""]
+    assert len(rows) == 10
+
+
+class CancelAfter(Progress):
+    """Cancela apenas se escribió el primer bloque."""
+
+    def step(self, n=1):
+        super().step(n)
+        if n:
+            self.cancel()
+
+
+def test_cancel_keeps_previous_file(sponsors, tmp_path):
+    out = tmp_path / "padrinos.csv"
+    out.write_text("anterior", encoding="utf-8")
+    progress = CancelAfter()
+    with pytest.raises(Cancelled):
+        exporters.write_csv(SPONSORS, out, progress)
+    assert progress.cancelled and progress.done == 3
+    # ni archivo a medias ni temporal olvidado
+    assert out.read_text(encoding="utf-8") == "anterior"
+    assert [p.name for p in tmp_path.glob("padrinos*")] == ["padrinos.csv"]
+
+
+def test_excel_rolls_over_to_new_sheet(sponsors, tmp_path, monkeypatch):
+    openpyxl = pytest.importorskip("openpyxl")
+    monkeypatch.setattr(exporters, "EXCEL_MAX_ROWS", 4)   # encabezado + 3 filas por hoja
+    out = tmp_path / "padrinos.xlsx"
+    assert exporters.write_excel(SPONSORS, out, title="Padrinos") == 9
+
+    wb = openpyxl.load_workbook(out, read_only=True)
+    assert wb.sheetnames == ["Padrinos", "Padrinos (2)", "Padrinos (3)"]
+    sheets = [list(ws.iter_rows(values_only=True)) for ws in wb.worksheets]
+    assert all(rows[0] == SPONSORS.columns for rows in sheets)
+    assert [len(rows) for rows in sheets] == [4, 4, 4]
+    ids = [r[0] for rows in sheets for r in rows[1:]]
+    assert ids == list(range(9, 0, -1))   # sin filas repetidas ni perdidas entre hojas
+    wb.close()
+
+
+def test_pdf_header_first_footer_last(sponsors, tmp_path, monkeypatch):
+    pytest.importorskip("pypdf")
+    from ui.pdf_utils import get_engine
+
+    engine = get_engine()
+    try:
+        engine.backend
+    except RuntimeError:
+        pytest.skip("sin backend de PDF")
+    docs = []
+    render = engine.render
+
+    def capture(html, out, css=""):
+        docs.append(html)
+        render(html, out, css)
+
+    monkeypatch.setattr(engine, "render", capture)
+    out = tmp_path / "padrinos.pdf"
+
+    # un solo bloque: encabezado y pie en el mismo documento
+    exporters.write_pdf(SPONSORS, out, title="Padrinos")
+    assert len(docs) == 1
+    assert "<h1>Padrinos</h1>" in docs[0] and "Generado por AlbergueApp" in docs[0]
+
+    docs.clear()
+    monkeypatch.setattr(exporters, "PDF_CHUNK_ROWS", 4)
+    assert exporters.write_pdf(SPONSORS, out, title="Padrinos") == 9
+    assert out.read_bytes().startswith(b"%PDF")
+    assert len(docs) == 3
+    assert ["<h1>Padrinos</h1>" in d for d in docs] == [True, False, False]
+    assert ["9 filas" in d for d in docs] == [True, False, False]
+    assert ["Generado por AlbergueApp" in d for d in docs] == [False, False, True]
+    assert all("<thead>" in d for d in docs)   # encabezados de columna en cada parte
@@ -0,0 +1,39 @@
+# tests/test_freshness.py
+from db import Freshness
+
+
+def _add_sponsor(db, name="Ana"):
+    with db.transaction("sponsors") as conn:
+        conn.execute("INSERT INTO sponsors(nombre) VALUES (?)", (name,))
+
+
+def test_seen_only_after_load(fresh_db):
+    fresh = Freshness()
+    assert fresh.stale("sponsors", "sponsors")
+    # la carga falló o se interrumpió: sigue vencida
+    assert fresh.stale("sponsors", "sponsors")
+    fresh.loaded("sponsors")
+    assert not fresh.stale("sponsors", "sponsors")
+
+
+def test_write_during_load_reloads(fresh_db):
+    fresh = Freshness()
+    _add_sponsor(fresh_db)
+    assert fresh.stale("sponsors", "sponsors")
+    _add_sponsor(fresh_db, "Beto")   # llega mientras la carga corre
+    fresh.loaded("sponsors")
+    assert fresh.stale("sponsors", "sponsors")
+    fresh.loaded("sponsors")
+    assert not fresh.stale("sponsors", "sponsors")
+
+
+def test_mark_and_keys(fresh_db):
+    fresh = Freshness()
+    assert fresh.stale("sponsors", "sponsors")
+    _add_sponsor(fresh_db)
+    fresh.mark("sponsors", "sponsors")   # la vista ya aplicó el alta
+    fresh.loaded("sponsors")             # la carga anterior no pisa la marca
+    assert not fresh.stale("sponsors", "sponsors")
+    assert fresh.stale(("pending", "2024-06-15"), "sponsors")
+    fresh.loaded("otra")                 # sin stale() previo no registra nada
+    assert fresh.stale("otra", "sponsors")
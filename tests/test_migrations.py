@@ -0,0 +1,87 @@
+# tests/test_migrations.py
+import sqlite3
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def legacy_db(tmp_path, monkeypatch):
+    """Base como la dejaba la versión anterior: tablas sin user_version y
+    fechas escritas a mano en varios formatos."""
+    path = tmp_path / "albergue.db"
+    conn = sqlite3.connect(path)
+    db._m001_base_schema(conn.cursor())
+    conn.executescript("""
+        INSERT INTO animal_types(nombre) VALUES ('Perro');
+        INSERT INTO animals(nombre, especie_id, ingreso_fecha, notas) VALUES
+            ('Luna', 1, '15/03/2024', NULL),
+            ('Toby', 1, 'marzo del 2023', 'Llegó herido'),
+            ('Kira', 1, '', NULL),
+            ('Max',  1, '2024-01-05', NULL);
+        INSERT INTO vaccines(animal_id, vacuna, fecha_aplicacion, proxima_fecha) VALUES
+            (1, 'Rabia', '01-02-2024', 'en un año');
+        INSERT INTO sponsors(nombre) VALUES ('Ana'), ('Beto');
+        INSERT INTO donations(fecha, sponsor_id, animal_id, monto) VALUES
+            ('15/03/2024', 1, 1, 100), ('20/03/2024', 2, NULL, 50), ('2024-04-02', 1, 2, 25);
+    """)
+    conn.commit()
+    conn.close()
+    db.close_conn()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    yield db
+    db.close_conn()
+
+
+def _animals():
+    return {r["nombre"]: (r["ingreso_fecha"], r["notas"])
+            for r in db.query("SELECT nombre, ingreso_fecha, notas FROM animals")}
+
+
+def test_upgrade_normalizes_dates(legacy_db):
+    legacy_db.init_db()
+    assert legacy_db.schema_version() == len(legacy_db.MIGRATIONS)
+
+    animals = _animals()
+    assert animals["Luna"] == ("2024-03-15", None)
+    assert animals["Max"] == ("2024-01-05", None)
+    assert animals["Kira"] == (None, None)
+    # lo que no se entiende no se pierde: queda al final de las notas
+    assert animals["Toby"] == (None, "Llegó herido [ingreso_fecha: marzo del 2023]")
+
+    vac = db.query_one("SELECT fecha_aplicacion, proxima_fecha, notas FROM vaccines")
+    assert tuple(vac) == ("2024-02-01", None, "[proxima_fecha: en un año]")
+
+
+def test_writes_reject_non_iso_dates(fresh_db):
+    with fresh_db.transaction() as conn:
+        conn.execute("INSERT INTO animal_types(nombre) VALUES ('Gato')")
+    with pytest.raises(sqlite3.IntegrityError):
+        with fresh_db.transaction() as conn:
+            conn.execute("INSERT INTO animals(nombre, especie_id, ingreso_fecha) "
+                         "VALUES ('Michi', 1, '15/03/2024')")
+    assert fresh_db.parse_date("15/03/2024") == "2024-03-15"
+
+
+def _totals(table, col):
+    return {r[0]: (r["total"], r["n"]) for r in db.query(f"SELECT {col}, total, n FROM {table}")}
+
+
+def test_upgrade_builds_donation_totals(legacy_db):
+    legacy_db.init_db()
+    # los meses salen de las fechas ya normalizadas a ISO
+    assert _totals("donation_month", "mes") == {"2024-03": (150, 2), "2024-04": (25, 1)}
+    assert _totals("donation_sponsor", "sponsor_id") == {1: (125, 2), 2: (50, 1)}
+    assert _totals("donation_animal", "animal_id") == {1: (100, 1), 2: (25, 1)}
+
+    # después los triggers los mantienen igual que un recálculo completo
+    with legacy_db.transaction("donations") as conn:
+        conn.execute("UPDATE donations SET fecha='2024-04-10', monto=60 WHERE id=1")
+        conn.execute("DELETE FROM donations WHERE id=2")
+        conn.execute("INSERT INTO donations(fecha, sponsor_id, monto) VALUES ('2024-05-01', 2, 10)")
+    kept = {t: _totals(t, c) for t, (c, _) in legacy_db.DONATION_TOTALS.items()}
+    with legacy_db.transaction("donations") as conn:
+        legacy_db.rebuild_donation_totals(conn.cursor())
+    assert kept == {t: _totals(t, c) for t, (c, _) in legacy_db.DONATION_TOTALS.items()}
+    assert kept["donation_month"] == {"2024-04": (85, 2), "2024-05": (10, 1)}
@@ -0,0 +1,117 @@
+# tests/test_paging.py
+import random
+
+import pytest
+
+import paging
+from paging import KeysetSource, Listing
+
+ANIMALS = Listing(
+    select="a.id, a.nombre, t.nombre AS tipo",
+    table="animals a",
+    joins="JOIN animal_types t ON t.id=a.especie_id",
+    sorts={"id": "a.id", "nombre": "a.nombre"},
+    id_col="a.id",
+)
+NAMES = ["Luna", "Toby", "Kira", "Max", "Nala", "Rocky", "Simba"]
+
+
+@pytest.fixture
+def animals(fresh_db, monkeypatch):
+    # páginas chicas para cruzar muchos límites con pocos datos
+    monkeypatch.setattr(paging, "PAGE_SIZE", 7)
+    monkeypatch.setattr(paging, "CACHED_PAGES", 2)
+    with fresh_db.transaction() as conn:
+        conn.executemany("INSERT INTO animal_types(nombre) VALUES (?)", [("Perro",), ("Gato",)])
+        conn.executemany(
+            "INSERT INTO animals(nombre, especie_id) VALUES (?, ?)",
+            [(NAMES[i % len(NAMES)], 1 + i % 2) for i in range(53)])
+    return fresh_db
+
+
+def expected(db, where="", params=(), order="a.id DESC"):
+    """Lo mismo con un ORDER BY común, sin paginar."""
+    return [tuple(r) for r in db.query(f"""
+        SELECT {ANIMALS.select} FROM {ANIMALS.table} {ANIMALS.joins}
+        {where} ORDER BY {order}""", params)]
+
+
+@pytest.mark.parametrize("sort, desc, order", [
+    ("id", True, "a.id DESC"),
+    ("id", False, "a.id"),
+    ("nombre", False, "a.nombre, a.id"),
+    ("nombre", True, "a.nombre DESC, a.id DESC"),
+])
+def test_windows_match_order_by(animals, sort, desc, order):
+    src = KeysetSource(ANIMALS, sort=sort, desc=desc)
+    want = expected(animals, order=order)
+    assert len(src) == len(want)
+    assert src.rows(0, len(src)) == want
+    rnd = random.Random(0)
+    for _ in range(50):
+        start = rnd.randrange(len(want))
+        stop = start + rnd.randrange(1, 20)
+        assert src.rows(start, stop) == want[start:stop]
+
+
+def test_filtered(animals):
+    where, params = "WHERE a.especie_id = ?", (2,)
+    src = KeysetSource(ANIMALS, where, params, sort="nombre", desc=False)
+    want = expected(animals, where, params, order="a.nombre, a.id")
+    assert len(src) == len(want) == 26
+    assert src.rows(0, len(src)) == want
+
+
+def test_empty(fresh_db):
+    src = KeysetSource(ANIMALS)
+    assert len(src) == 0
+    assert src.rows(0, 10) == []
+
+
+def _index(src, id_):
+    return next(i for i, r in enumerate(src.rows(0, len(src))) if r[0] == id_)
+
+
+@pytest.mark.parametrize("sort, desc, order", [
+    ("id", True, "a.id DESC"),
+    ("nombre", False, "a.nombre, a.id"),
+])
+def test_patches_match_order_by(animals, sort, desc, order):
+    where, params = "WHERE a.especie_id = ?", (1,)
+    src = KeysetSource(ANIMALS, where, params, sort=sort, desc=desc)
+    rnd = random.Random(1)
+    for step in range(120):
+        ids = [r[0] for r in animals.query(f"SELECT a.id FROM animals a {where}", params)]
+        op = rnd.choice(["insert", "insert", "rename", "move", "delete"]) if ids else "insert"
+        with animals.transaction() as conn:
+            if op == "insert":
+                id_ = conn.execute("INSERT INTO animals(nombre, especie_id) VALUES (?, 1)",
+                                   (rnd.choice(NAMES) + str(step),)).lastrowid
+                src.insert(src.fetch(id_))
+                continue
+            id_ = rnd.choice(ids)
+            index = _index(src, id_)   # posición en la vista antes del cambio
+            if op == "rename":
+                conn.execute("UPDATE animals SET nombre=? WHERE id=?", (rnd.choice(NAMES), id_))
+                src.replace(index, src.fetch(id_))
+            elif op == "move":   # deja de pasar el filtro
+                conn.execute("UPDATE animals SET especie_id=2 WHERE id=?", (id_,))
+                assert src.fetch(id_) is None
+                assert src.replace(index, None) is None
+            else:
+                conn.execute("DELETE FROM animals WHERE id=?", (id_,))
+                src.pop(index)
+        want = expected(animals, where, params, order)
+        assert len(src) == len(want), (step, op)
+        assert src.rows(0, len(src)) == want, (step, op)
+
+
+def test_insert_splits_crowded_page(animals):
+    src = KeysetSource(ANIMALS, sort="nombre", desc=False)
+    for i in range(40):   # todas caen en la misma página
+        with animals.transaction() as conn:
+            id_ = conn.execute("INSERT INTO animals(nombre, especie_id) VALUES (?, 1)",
+                               (f"Luna{i:02d}",)).lastrowid
+        src.insert(src.fetch(id_))
+    assert max(src._sizes) < 2 * paging.PAGE_SIZE
+    assert src.rows(0, len(src)) == expected(animals, order="a.nombre, a.id")
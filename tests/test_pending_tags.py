@@ -0,0 +1,40 @@
+# tests/test_pending_tags.py
+from datetime import date, timedelta
+from tkinter import ttk
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+from db import Freshness
+from reminders import Reminder
+from ui.dashboard import DashboardFrame
+from ui.health import HealthFrame
+
+TODAY = date.today()
+ROWS = [
+    Reminder("Vacuna", "Toby", "Rabia", TODAY - timedelta(days=3)),
+    Reminder("Desparasitación", "Luna", "X", TODAY + timedelta(days=2)),
+    Reminder("Vacuna", "Toby", "Moquillo", TODAY + timedelta(days=20)),
+]
+EXPECTED = [("late",), ("soon",), ("ok",)]
+
+
+def _tags(tv):
+    return [tuple(tv.item(iid, "tags")) for iid in tv.get_children()]
+
+
+def test_health_pending_keeps_status_tags(tk_root):
+    frame = SimpleNamespace(pending_tv=ttk.Treeview(tk_root, columns=("a", "b", "c", "d", "e")),
+                            fresh=Freshness())
+    HealthFrame._render_pending(frame, ROWS, TODAY)
+    assert _tags(frame.pending_tv) == EXPECTED
+
+
+def test_dashboard_pending_keeps_status_tags(tk_root):
+    frame = SimpleNamespace(
+        _shown=None,
+        tv_pending=ttk.Treeview(tk_root, columns=("a", "b", "c", "d", "e")),
+        kpi_values=[MagicMock() for _ in range(4)],
+        kpi_cards=[(MagicMock(), MagicMock()) for _ in range(4)],
+    )
+    DashboardFrame._render(frame, {"kpis": (1, 2, 3.0, 4, 5), "pending": ROWS, "months": 6})
+    assert _tags(frame.tv_pending) == EXPECTED
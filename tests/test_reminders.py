@@ -0,0 +1,55 @@
+# tests/test_reminders.py
+from datetime import date, timedelta
+
+import reminders
+from reminders import Reminder
+
+TODAY = date(2024, 6, 15)
+
+
+def d(days):
+    return (TODAY + timedelta(days=days)).isoformat()
+
+
+def _add(db, table, col, animal, producto, aplicada, proxima):
+    with db.transaction(table) as conn:
+        conn.execute(
+            f"INSERT INTO {table}(animal_id, {col}, fecha_aplicacion, proxima_fecha) VALUES (?, ?, ?, ?)",
+            (animal, producto, aplicada, proxima))
+
+
+def _setup(db):
+    with db.transaction("animals") as conn:
+        conn.execute("INSERT INTO animal_types(nombre) VALUES ('Perro')")
+        conn.executemany("INSERT INTO animals(nombre, especie_id) VALUES (?, 1)", [("Luna",), ("Toby",)])
+
+
+def test_later_dose_hides_previous(fresh_db):
+    _setup(fresh_db)
+    # Luna: la dosis vieja ya venció, pero se volvió a vacunar (otra mayúscula)
+    _add(fresh_db, "vaccines", "vacuna", 1, "Rabia", d(-370), d(-5))
+    _add(fresh_db, "vaccines", "vacuna", 1, "rabia", d(-4), d(361))
+    # Toby: la misma vacuna sin refuerzo sigue vencida
+    _add(fresh_db, "vaccines", "vacuna", 2, "Rabia", d(-370), d(-5))
+    # dos dosis el mismo día: cuenta la última cargada
+    _add(fresh_db, "dewormings", "producto", 2, "Bravecto", d(-10), d(3))
+    _add(fresh_db, "dewormings", "producto", 2, "Bravecto", d(-10), d(80))
+
+    assert reminders.due(TODAY) == [
+        Reminder("Vacuna", "Toby", "Rabia", TODAY - timedelta(days=5)),
+    ]
+    assert reminders.due(TODAY, days=90)[-1] == \
+        Reminder("Desparasitación", "Toby", "Bravecto", TODAY + timedelta(days=80))
+
+
+def test_windows(fresh_db):
+    _setup(fresh_db)
+    for i, days in enumerate((-reminders.OVERDUE_DAYS - 1, -reminders.OVERDUE_DAYS, -1, 0,
+                              reminders.SOON_DAYS, reminders.SOON_DAYS + 1, 30, 31)):
+        _add(fresh_db, "vaccines", "vacuna", 1, f"V{i}", d(days - 365), d(days))
+
+    got = reminders.due(TODAY)
+    assert [r.days(TODAY) for r in got] == [-reminders.OVERDUE_DAYS, -1, 0,
+                                            reminders.SOON_DAYS, reminders.SOON_DAYS + 1, 30]
+    assert [r.status(TODAY) for r in got] == ["late", "late", "soon", "soon", "ok", "ok"]
+    assert reminders.due(TODAY, days=0, overdue=0) == [got[2]]
@@ -0,0 +1,53 @@
+# tests/test_reports_data.py
+import random
+
+import pytest
+
+import reports_data
+from paging import PAGE_SIZE
+from reports_data import REPORTS, ReportSource
+
+
+@pytest.fixture
+def animals(fresh_db):
+    with fresh_db.transaction("animals", "animal_types") as conn:
+        conn.execute("INSERT INTO animal_types(nombre) VALUES ('Perro')")
+        conn.executemany(
+            "INSERT INTO animals(nombre, especie_id, sexo, edad_meses) VALUES (?, 1, ?, ?)",
+            [(f"Animal {i}", "M" if i % 2 else None, i % 30 or None) for i in range(2 * PAGE_SIZE + 37)])
+    return fresh_db
+
+
+def test_windows_match_report_query(animals):
+    report = REPORTS["Animales"]
+    want = [tuple("" if v is None else v for v in r) for r in animals.query(report.sql)]
+    src = ReportSource(report)
+    assert len(src) == len(want)
+    assert src.rows(0, len(src)) == want
+    rnd = random.Random(0)
+    for _ in range(50):
+        start = rnd.randrange(len(want))
+        stop = start + rnd.randrange(1, 60)
+        assert src.rows(start, stop) == want[start:stop]
+    assert src.rows(len(want), len(want) + 10) == []
+
+
+def test_reads_only_visible_pages(animals, monkeypatch):
+    fetched = []
+    fetch = reports_data._fetch
+
+    def counting(sql, params=()):
+        fetched.append(params)
+        return fetch(sql, params)
+
+    monkeypatch.setattr(reports_data, "_fetch", counting)
+    src = ReportSource(REPORTS["Animales"])
+    src.rows(PAGE_SIZE - 5, PAGE_SIZE + 5)
+    src.rows(0, 10)   # ya en caché
+    assert fetched == [(PAGE_SIZE, 0), (PAGE_SIZE, PAGE_SIZE)]
+
+
+def test_empty_report(fresh_db):
+    src = ReportSource(REPORTS["Donaciones"])
+    assert len(src) == 0
+    assert src.rows(0, 50) == []
@@ -2,13 +2,38 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from ttkbootstrap.widgets import DateEntry
 
-from db import get_conn
-from ui.theme import zebra_fill, paint_rows
+from db import query_one, transaction, parse_date, Freshness
+from paging import Listing, KeysetSource
+from lookups import ANIMALS, ADOPTERS, AVAILABLE_ANIMALS
+from ui.async_loader import AsyncLoader
+from ui.virtual_table import VirtualTable
+from ui.typeahead import TypeaheadCombobox, PrefixIndex
+from ui.theme import zebra_fill
 from ui.rounded import RoundedCard
 
 ESTADOS = ["EN_PROCESO", "ADOPTADO", "RECHAZADO"]
 BTN_W = 14  # ancho uniforme para acciones
 
+ADOPTER_ROWS = Listing(
+    select="id, nombre, documento, telefono, correo",
+    table="adopters",
+    sorts={"id": "id"},
+    id_col="id",
+)
+# de qué tablas depende cada parte de la pantalla
+TABLAS_VISTA = {
+    "lookups":   ("animals", "adopters", "adoptions"),
+    "adopters":  ("adopters",),
+    "adoptions": ("adoptions", "animals", "adopters"),
+}
+ADOPTIONS = Listing(
+    select="ad.id, a.nombre AS animal, ap.nombre AS adoptante, ad.estado, ad.fecha_egreso",
+    table="adoptions ad",
+    joins="JOIN animals a ON a.id = ad.animal_id JOIN adopters ap ON ap.id = ad.adopter_id",
+    sorts={"id": "ad.id"},
+    id_col="ad.id",
+)
+
 
 class AdoptionsFrame(ttk.Frame):
     def __init__(self, master):
@@ -16,10 +41,11 @@ class AdoptionsFrame(ttk.Frame):
 
         self.sel_adopter_id = None
         self.sel_adoption_id = None
+        self.fresh = Freshness()
+        self.loader = AsyncLoader(self)
 
         self._build_ui()
-        self.load_lookups()
-        self.load_tables()
+        self.refresh()
         self._set_mode_adopter("new")
         self._set_mode_adoption("new")
 
@@ -76,7 +102,7 @@ class AdoptionsFrame(ttk.Frame):
         # tabla adoptantes + scrollbar
         tbl_wrap_a = ttk.Frame(adop_card.body)
         tbl_wrap_a.grid(row=2, column=0, sticky="nsew")
-        self.tv_adopters = ttk.Treeview(
+        self.tv_adopters = VirtualTable(
             tbl_wrap_a,
             columns=("id", "nombre", "doc", "tel", "correo"),
             show="headings", height=14, style="Modern.Treeview"
@@ -113,8 +139,8 @@ class AdoptionsFrame(ttk.Frame):
         for c in range(4):
             d_form.columnconfigure(c, weight=1)
 
-        self.cmb_animal = ttk.Combobox(d_form, state="readonly")
-        self.cmb_adopter = ttk.Combobox(d_form, state="readonly")
+        self.cmb_animal = TypeaheadCombobox(d_form)
+        self.cmb_adopter = TypeaheadCombobox(d_form)
         self.estado = tk.StringVar(value=ESTADOS[0])
         self.egreso = DateEntry(d_form, bootstyle="info", dateformat="%Y-%m-%d", width=12)
         self.obs = tk.StringVar()
@@ -148,7 +174,7 @@ class AdoptionsFrame(ttk.Frame):
         # tabla adopciones + scrollbar
         tbl_wrap_d = ttk.Frame(adp_card.body)
         tbl_wrap_d.grid(row=2, column=0, sticky="nsew")
-        self.tv_adoptions = ttk.Treeview(
+        self.tv_adoptions = VirtualTable(
             tbl_wrap_d,
             columns=("id", "animal", "adoptante", "estado", "egreso"),
             show="headings", height=14, style="Modern.Treeview"
@@ -218,51 +244,39 @@ class AdoptionsFrame(ttk.Frame):
 
     # ===================== Lookups / Tablas =====================
     def load_lookups(self):
-        conn = get_conn(); cur = conn.cursor()
+        self.loader.submit("lookups", self._query_lookups, self._render_lookups)
 
+    def _query_lookups(self):
         # 🔹 Solo animales NO adoptados (ocultar aquí, mantener visibles en demás módulos/reportes)
-        animals = cur.execute("""
-            SELECT a.id, a.nombre
-            FROM animals a
-            WHERE NOT EXISTS (
-                SELECT 1 FROM adoptions ad
-                WHERE ad.animal_id = a.id
-                  AND UPPER(ad.estado) = 'ADOPTADO'
-            )
-            ORDER BY a.nombre
-        """).fetchall()
-
-        adopters = cur.execute("SELECT id, nombre FROM adopters ORDER BY nombre").fetchall()
-
-        self.cmb_animal["values"] = [f"{r['id']} - {r['nombre']}" for r in animals]
-        self.cmb_adopter["values"] = [f"{r['id']} - {r['nombre']}" for r in adopters]
-
-        conn.close()
-
-    def load_tables(self):
-        conn = get_conn(); cur = conn.cursor()
-
-        rows = cur.execute("SELECT * FROM adopters ORDER BY id DESC").fetchall()
-        self.tv_adopters.delete(*self.tv_adopters.get_children())
-        for r in rows:
-            self.tv_adopters.insert("", "end",
-                                    values=(r["id"], r["nombre"], r["documento"], r["telefono"], r["correo"]))
-
-        rows2 = cur.execute("""
-            SELECT ad.id, a.nombre AS animal, ap.nombre AS adoptante, ad.estado, ad.fecha_egreso
-            FROM adoptions ad
-            JOIN animals a  ON a.id = ad.animal_id
-            JOIN adopters ap ON ap.id = ad.adopter_id
-            ORDER BY ad.id DESC
-        """).fetchall()
-        self.tv_adoptions.delete(*self.tv_adoptions.get_children())
-        for r in rows2:
-            self.tv_adoptions.insert("", "end",
-                                     values=(r["id"], r["animal"], r["adoptante"], r["estado"], r["fecha_egreso"]))
-        conn.close()
-
-        paint_rows(self.tv_adopters)
-        paint_rows(self.tv_adoptions)
+        return PrefixIndex(AVAILABLE_ANIMALS.labels()), PrefixIndex(ADOPTERS.labels())
+
+    def _render_lookups(self, result):
+        animals, adopters = result
+        self.cmb_animal["values"] = animals
+        self.cmb_adopter["values"] = adopters
+        self.fresh.loaded("lookups")
+
+    def load_adopters(self):
+        self.loader.submit("adopters", lambda: KeysetSource(ADOPTER_ROWS),
+                           lambda src: self._render_table("adopters", self.tv_adopters, src))
+
+    def load_adoptions(self):
+        self.loader.submit("adoptions", lambda: KeysetSource(ADOPTIONS),
+                           lambda src: self._render_table("adoptions", self.tv_adoptions, src))
+
+    def _render_table(self, key, tv, source):
+        tv.set_source(source)
+        self.fresh.loaded(key)
+
+    def _patch(self, key, change, *also_fresh):
+        """Aplica un alta/edición/baja directo sobre la tabla `key`, sin
+        recargarla; `also_fresh` son otras vistas que el cambio no afecta.
+        Si hay una carga en curso (o no se sabe qué fila era) se recarga entera."""
+        if change is not None and not self.loader.busy(key):
+            change()
+            for k in (key,) + also_fresh:
+                self.fresh.mark(k, *TABLAS_VISTA[k])
+        self.refresh()
 
     # ===================== Adoptantes CRUD =====================
     def on_select_adopter(self, _):
@@ -273,9 +287,7 @@ class AdoptionsFrame(ttk.Frame):
         self.sel_adopter_id = int(v[0])
         self.ad_nombre.set(v[1]); self.ad_doc.set(v[2]); self.ad_tel.set(v[3]); self.ad_correo.set(v[4])
 
-        conn = get_conn(); cur = conn.cursor()
-        r = cur.execute("SELECT COALESCE(direccion,'') d FROM adopters WHERE id=?", (self.sel_adopter_id,)).fetchone()
-        conn.close()
+        r = query_one("SELECT COALESCE(direccion,'') d FROM adopters WHERE id=?", (self.sel_adopter_id,))
         if r:
             self.ad_dir.set(r["d"])
         self._set_mode_adopter("edit")
@@ -284,38 +296,40 @@ class AdoptionsFrame(ttk.Frame):
         if not self.ad_nombre.get().strip():
             messagebox.showwarning("Falta", "Nombre del adoptante requerido")
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO adopters(nombre, documento, telefono, correo, direccion)
-            VALUES(?,?,?,?,?)
-        """, (self.ad_nombre.get().strip(), self.ad_doc.get().strip(), self.ad_tel.get().strip(),
-              self.ad_correo.get().strip(), self.ad_dir.get().strip()))
-        conn.commit(); conn.close()
+        with transaction("adopters") as conn:
+            new_id = conn.execute("""
+                INSERT INTO adopters(nombre, documento, telefono, correo, direccion)
+                VALUES(?,?,?,?,?)
+            """, (self.ad_nombre.get().strip(), self.ad_doc.get().strip(), self.ad_tel.get().strip(),
+                  self.ad_correo.get().strip(), self.ad_dir.get().strip())).lastrowid
         self.new_adopter()
-        self.load_lookups(); self.load_tables()
+        # un adoptante nuevo todavía no aparece en ninguna adopción
+        self._patch("adopters", lambda: self.tv_adopters.insert_row(self.tv_adopters.source.fetch(new_id)),
+                    "adoptions")
 
     def update_adopter(self):
         if not self.sel_adopter_id:
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            UPDATE adopters SET nombre=?, documento=?, telefono=?, correo=?, direccion=? WHERE id=?
-        """, (self.ad_nombre.get().strip(), self.ad_doc.get().strip(), self.ad_tel.get().strip(),
-              self.ad_correo.get().strip(), self.ad_dir.get().strip(), self.sel_adopter_id))
-        conn.commit(); conn.close()
+        pid, index = self.sel_adopter_id, self.tv_adopters.selected_index()
+        with transaction("adopters") as conn:
+            conn.execute("""
+                UPDATE adopters SET nombre=?, documento=?, telefono=?, correo=?, direccion=? WHERE id=?
+            """, (self.ad_nombre.get().strip(), self.ad_doc.get().strip(), self.ad_tel.get().strip(),
+                  self.ad_correo.get().strip(), self.ad_dir.get().strip(), pid))
         self.new_adopter()
-        self.load_lookups(); self.load_tables()
+        self._patch("adopters", None if index is None else
+                    lambda: self.tv_adopters.update_row(index, self.tv_adopters.source.fetch(pid)))
 
     def delete_adopter(self):
         if not self.sel_adopter_id:
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar adoptante?"):
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("DELETE FROM adopters WHERE id=?", (self.sel_adopter_id,))
-        conn.commit(); conn.close()
+        index = self.tv_adopters.selected_index()
+        with transaction("adopters") as conn:
+            conn.execute("DELETE FROM adopters WHERE id=?", (self.sel_adopter_id,))
         self.new_adopter()
-        self.load_lookups(); self.load_tables()
+        self._patch("adopters", None if index is None else lambda: self.tv_adopters.delete_row(index))
 
     # ===================== Adopciones CRUD =====================
     def on_select_adoption(self, _):
@@ -334,79 +348,79 @@ class AdoptionsFrame(ttk.Frame):
             if v[4]:
                 self.egreso.entry.insert(0, v[4])
 
-        conn = get_conn(); cur = conn.cursor()
-        r = cur.execute("""
-            SELECT a.id AS aid, ap.id AS pid
-            FROM adoptions ad
-            JOIN animals a  ON a.id = ad.animal_id
-            JOIN adopters ap ON ap.id = ad.adopter_id
-            WHERE ad.id = ?
-        """, (self.sel_adoption_id,)).fetchone()
-        conn.close()
+        # ids + observaciones por PK; los nombres salen de los lookups
+        r = query_one("SELECT animal_id, adopter_id, COALESCE(observaciones,'') AS o "
+                      "FROM adoptions WHERE id = ?", (self.sel_adoption_id,))
         if r:
-            self.cmb_animal.set(self._fmt("animals", r["aid"]))
-            self.cmb_adopter.set(self._fmt("adopters", r["pid"]))
-
-        conn = get_conn(); cur = conn.cursor()
-        r2 = cur.execute("SELECT COALESCE(observaciones,'') o FROM adoptions WHERE id=?",
-                         (self.sel_adoption_id,)).fetchone()
-        conn.close()
-        if r2:
-            self.obs.set(r2["o"])
+            self.cmb_animal.set(self._fmt("animals", r["animal_id"]))
+            self.cmb_adopter.set(self._fmt("adopters", r["adopter_id"]))
+            self.obs.set(r["o"])
 
         self._set_mode_adoption("edit")
 
     def _fmt(self, table, id_):
-        conn = get_conn(); cur = conn.cursor()
-        if table == "animals":
-            n = cur.execute("SELECT nombre FROM animals WHERE id=?", (id_,)).fetchone()["nombre"]
-        else:
-            n = cur.execute("SELECT nombre FROM adopters WHERE id=?", (id_,)).fetchone()["nombre"]
-        conn.close()
-        return f"{id_} - {n}"
+        return (ANIMALS if table == "animals" else ADOPTERS).label(id_)
 
     def save_adoption(self):
-        if not self.cmb_animal.get().strip() or not self.cmb_adopter.get().strip():
+        if self.cmb_animal.selected_id() is None or self.cmb_adopter.selected_id() is None:
             messagebox.showwarning("Falta", "Seleccione animal y adoptante")
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO adoptions(animal_id, adopter_id, estado, fecha_egreso, observaciones)
-            VALUES(?,?,?,?,?)
-        """, (int(self.cmb_animal.get().split(" - ")[0]),
-              int(self.cmb_adopter.get().split(" - ")[0]),
-              self.estado.get(), self.egreso.entry.get().strip(), self.obs.get().strip()))
-        conn.commit(); conn.close()
+        try:
+            egreso = parse_date(self.egreso.entry.get())
+        except ValueError as e:
+            messagebox.showwarning("Fecha", str(e))
+            return
+        with transaction("adoptions") as conn:
+            new_id = conn.execute("""
+                INSERT INTO adoptions(animal_id, adopter_id, estado, fecha_egreso, observaciones)
+                VALUES(?,?,?,?,?)
+            """, (self.cmb_animal.selected_id(),
+                  self.cmb_adopter.selected_id(),
+                  self.estado.get(), egreso, self.obs.get().strip())).lastrowid
         self.new_adoption()
-        self.load_tables()
+        self._patch("adoptions", lambda: self.tv_adoptions.insert_row(self.tv_adoptions.source.fetch(new_id)))
 
     def update_adoption(self):
         if not self.sel_adoption_id:
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            UPDATE adoptions
-               SET animal_id=?, adopter_id=?, estado=?, fecha_egreso=?, observaciones=?
-             WHERE id=?
-        """, (int(self.cmb_animal.get().split(" - ")[0]),
-              int(self.cmb_adopter.get().split(" - ")[0]),
-              self.estado.get(), self.egreso.entry.get().strip(), self.obs.get().strip(), self.sel_adoption_id))
-        conn.commit(); conn.close()
+        if self.cmb_animal.selected_id() is None or self.cmb_adopter.selected_id() is None:
+            messagebox.showwarning("Falta", "Seleccione animal y adoptante")
+            return
+        aid, index = self.sel_adoption_id, self.tv_adoptions.selected_index()
+        try:
+            egreso = parse_date(self.egreso.entry.get())
+        except ValueError as e:
+            messagebox.showwarning("Fecha", str(e))
+            return
+        with transaction("adoptions") as conn:
+            conn.execute("""
+                UPDATE adoptions
+                   SET animal_id=?, adopter_id=?, estado=?, fecha_egreso=?, observaciones=?
+                 WHERE id=?
+            """, (self.cmb_animal.selected_id(),
+                  self.cmb_adopter.selected_id(),
+                  self.estado.get(), egreso, self.obs.get().strip(), aid))
         self.new_adoption()
-        self.load_tables()
+        self._patch("adoptions", None if index is None else
+                    lambda: self.tv_adoptions.update_row(index, self.tv_adoptions.source.fetch(aid)))
 
     def delete_adoption(self):
         if not self.sel_adoption_id:
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar adopción?"):
             return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("DELETE FROM adoptions WHERE id=?", (self.sel_adoption_id,))
-        conn.commit(); conn.close()
+        index = self.tv_adoptions.selected_index()
+        with transaction("adoptions") as conn:
+            conn.execute("DELETE FROM adoptions WHERE id=?", (self.sel_adoption_id,))
         self.new_adoption()
-        self.load_tables()
+        self._patch("adoptions", None if index is None else lambda: self.tv_adoptions.delete_row(index))
 
     # ===================== API público =====================
     def refresh(self):
-        self.load_lookups()
-        self.load_tables()
+        """Recarga solo lo que cambió desde la última vez que se mostró."""
+        if self.fresh.stale("lookups", *TABLAS_VISTA["lookups"]):
+            self.load_lookups()
+        if self.fresh.stale("adopters", *TABLAS_VISTA["adopters"]):
+            self.load_adopters()
+        if self.fresh.stale("adoptions", *TABLAS_VISTA["adoptions"]):
+            self.load_adoptions()
@@ -0,0 +1,124 @@
+# ui/async_loader.py
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import messagebox
+
+from db import get_conn
+
+# Pool compartido por todas las pantallas. Cada hilo abre su propia conexión
+# (db.get_conn es por hilo), así que las consultas no se pisan.
+_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix="loader")
+
+POLL_MS = 30
+
+
+class AsyncLoader:
+    """Corre funciones en el pool y entrega el resultado en el hilo de Tk.
+
+    submit(key, fn, on_done) lanza `fn()` en segundo plano y llama
+    `on_done(resultado)` desde el mainloop. Un submit nuevo con la misma `key`
+    reemplaza al anterior: si aún no arrancó se cancela, y si ya corría se
+    interrumpe su consulta en curso y su resultado se descarta. Mientras haya trabajos, el widget muestra el cursor
+    de espera (sin bloquear la ventana)."""
+
+    def __init__(self, widget):
+        self.widget = widget
+        self._queue = queue.Queue()
+        self._latest = {}      # key -> future vigente
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._polling = False
+
+    def submit(self, key, fn, on_done, on_error=None):
+        self._drop(self._latest.get(key))
+        job = {}  # mientras corre: {"conn": conexión de su hilo}
+        fut = _pool.submit(self._run, job, fn)
+        fut.job = job
+        self._latest[key] = fut
+        self._pending += 1
+        # el callback corre en el hilo del pool: solo encola, nunca toca Tk
+        fut.add_done_callback(lambda f: self._queue.put((key, f, on_done, on_error)))
+        self._set_busy(True)
+        if not self._polling:
+            self._polling = True
+            self.widget.after(POLL_MS, self._poll)
+        return fut
+
+    def cancel(self, key):
+        """Descarta el trabajo pendiente de `key` (si lo hay)."""
+        self._drop(self._latest.pop(key, None))
+
+    def busy(self, key=None) -> bool:
+        if key is None:
+            return self._pending > 0
+        fut = self._latest.get(key)
+        return fut is not None and not fut.done()
+
+    # ---------- interno (hilo del pool) ----------
+    def _run(self, job, fn):
+        with self._lock:
+            job["conn"] = get_conn()
+        try:
+            return fn()
+        finally:
+            with self._lock:
+                job.pop("conn", None)
+
+    # ---------- interno (hilo de Tk) ----------
+    def _drop(self, fut):
+        """Cancela `fut`; si ya corre, corta la consulta SQLite que esté haciendo
+        (termina con OperationalError 'interrupted' y nadie lo recibe)."""
+        if fut is None or fut.cancel():
+            return
+        with self._lock:
+            conn = fut.job.get("conn")
+            if conn is not None:
+                conn.interrupt()
+
+    def _poll(self):
+        ready = []
+        try:
+            while True:
+                key, fut, on_done, on_error = self._queue.get_nowait()
+                self._pending -= 1
+                if self._latest.get(key) is not fut or fut.cancelled():
+                    continue  # reemplazado o cancelado
+                del self._latest[key]
+                ready.append((fut, on_done, on_error))
+        except queue.Empty:
+            pass
+
+        # se reprograma antes de renderizar: un error en on_done no corta el sondeo
+        if self._pending > 0:
+            try:
+                self.widget.after(POLL_MS, self._poll)
+            except Exception:
+                self._polling = False  # el widget ya no existe
+        else:
+            self._polling = False
+            self._set_busy(False)
+
+        for fut, on_done, on_error in ready:
+            self._deliver(fut, on_done, on_error)
+
+    def _deliver(self, fut, on_done, on_error):
+        exc = fut.exception()
+        if exc is None:
+            on_done(fut.result())
+        elif on_error is not None:
+            on_error(exc)
+        else:
+            messagebox.showerror("Datos", f"No fue posible cargar los datos:\n{exc}")
+
+    def _set_busy(self, on: bool):
+        # cursor "" hereda el del padre, así cubre también a los hijos
+        try:
+            self.widget.configure(cursor="watch" if on else "")
+        except Exception:
+            pass
+
+
+def shutdown():
+    """Descarta lo pendiente al cerrar la app."""
+    _pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,103 @@
+# ui/busy.py
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+from exporters import Cancelled
+from ui.async_loader import AsyncLoader
+
+
+POLL_MS = 100  # cada cuánto se lee el avance del worker
+
+
+class BusyPopup(tk.Toplevel):
+    """Ventana de espera. Con `progress` (exporters.Progress) la barra muestra
+    el avance real y hay un botón Cancelar; sin él, la barra solo se mueve."""
+
+    def __init__(self, master, text="Procesando…", progress=None):
+        super().__init__(master)
+        self.progress = progress
+        self.title("Trabajando…")
+        self.resizable(False, False)
+        self.transient(master)
+
+        # Fuerza que quede arriba y visible
+        self.lift()
+        self.attributes("-topmost", True)
+
+        frm = ttk.Frame(self, padding=14)
+        frm.pack(fill="both", expand=True)
+        ttk.Label(frm, text=text).pack(anchor="w", pady=(0, 6))
+        if progress is None:
+            self.pb = ttk.Progressbar(frm, mode="indeterminate", length=300)
+            self.pb.pack(fill="x")
+            self.pb.start(12)
+        else:
+            self.pb = ttk.Progressbar(frm, mode="determinate", length=300, maximum=1.0)
+            self.pb.pack(fill="x")
+            self.lbl = ttk.Label(frm, text="", foreground="#64748B")
+            self.lbl.pack(anchor="w", pady=(4, 0))
+            self.btn_cancel = ttk.Button(frm, text="Cancelar", command=self._cancel)
+            self.btn_cancel.pack(anchor="e", pady=(8, 0))
+            self.protocol("WM_DELETE_WINDOW", self._cancel)
+            self._poll()
+
+        # Centrado relativo a la ventana principal
+        self.update_idletasks()
+        try:
+            x = master.winfo_rootx() + (master.winfo_width() // 2 - self.winfo_width() // 2)
+            y = master.winfo_rooty() + (master.winfo_height() // 2 - self.winfo_height() // 2)
+            self.geometry(f"+{x}+{y}")
+        except Exception:
+            pass
+
+        # Muy importante: mostrar YA
+        self.deiconify()
+        self.update()                 # fuerza pintado
+        # quitamos grab_set (algunas combinaciones lo ocultan bajo diálogos del SO)
+        # self.grab_set()
+
+        # después de pintarse, ya no es “always on top”
+        self.after(150, lambda: self.attributes("-topmost", False))
+
+    def _poll(self):
+        # el worker solo escribe números en `progress`; aquí se pintan
+        p = self.progress
+        self.pb["value"] = p.fraction()
+        if p.total:
+            self.lbl.config(text=f"{p.done:,} de {p.total:,}".replace(",", "."))
+        self._after = self.after(POLL_MS, self._poll)
+
+    def _cancel(self):
+        self.progress.cancel()
+        self.btn_cancel.state(["disabled"])
+        self.lbl.config(text="Cancelando…")
+
+    def close(self):
+        if self.progress is not None:
+            self.after_cancel(self._after)
+        try:
+            self.pb.stop()
+        except Exception:
+            pass
+        self.destroy()
+
+
+def run_with_busy(widget, titulo: str, worker, on_ok_msg: str, progress=None):
+    """Muestra BusyPopup, corre `worker` en el pool y al terminar cierra y notifica.
+    Los diálogos se muestran siempre desde el hilo de Tk. Si el worker avanza
+    un `progress`, la ventana lo muestra y permite cancelar."""
+    root = widget.winfo_toplevel()
+    busy = BusyPopup(root, text=titulo, progress=progress)
+
+    def _ok(_result):
+        busy.close()
+        messagebox.showinfo("Exportación", on_ok_msg)
+
+    def _err(e):
+        busy.close()
+        if isinstance(e, Cancelled):
+            messagebox.showinfo("Exportación", "Exportación cancelada.")
+            return
+        messagebox.showerror("Exportación", f"Ocurrió un error:\n{e}")
+
+    AsyncLoader(root).submit("export", worker, _ok, _err)
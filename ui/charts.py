@@ -0,0 +1,137 @@
+# ui/charts.py
+import importlib.util
+import threading
+import tkinter as tk
+
+from ui.async_loader import AsyncLoader
+
+# Gráficos (opcional). Solo se verifica que esté instalado: matplotlib se
+# importa en el pool con el primer dibujo, no al arrancar la app.
+MATPLOTLIB_OK = all(importlib.util.find_spec(m) is not None for m in ("matplotlib", "numpy"))
+FIGSIZE = (6.4, 5.4)
+REQ_SIZE = (320, 240)   # píxeles que pide al layout, fijos: la imagen sigue a la celda
+
+RESIZE_MS = 150   # espera tras redimensionar antes de volver a dibujar
+MAX_XTICKS = 12   # con 24 meses se rotula uno sí y uno no
+
+
+class DashboardCharts(tk.Label):
+    """Gráficos del dashboard (donaciones por mes y animales por tipo).
+
+    La figura es Agg pura (sin canvas de Tk): se dibuja en el pool y el
+    resultado llega como imagen a este Label, así el dibujo nunca bloquea la
+    ventana. Las artistas se crean una vez (línea y barras) y solo se les
+    cambian los datos; si la serie y el tamaño no cambiaron no se dibuja.
+
+    El Label pide siempre REQ_SIZE, no el tamaño de la imagen: si no, grid le
+    daría a su columna todo el espacio libre y cada dibujo (hecho al tamaño
+    de la celda) la volvería a agrandar."""
+
+    def __init__(self, master, dpi=100, **kw):
+        # con una imagen puesta, width/height del Label van en píxeles
+        self._img = tk.PhotoImage(master=master, width=1, height=1)
+        kw.update(bd=0, padx=0, pady=0, highlightthickness=0, image=self._img,
+                  width=REQ_SIZE[0], height=REQ_SIZE[1])
+        super().__init__(master, **kw)
+        self.dpi = dpi
+        self.loader = AsyncLoader(self)
+        self._lock = threading.Lock()   # la figura la usa un solo hilo a la vez
+        self._series = None             # últimos datos pedidos
+        self._drawn = None              # (datos, tamaño) de la imagen actual
+        self._after = None
+        self.fig = None                 # se arma en el primer dibujo
+        self.bind("<Configure>", self._on_resize)
+
+    def _build_figure(self):
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.ticker import MaxNLocator
+
+        self.fig = Figure(figsize=FIGSIZE, dpi=self.dpi, constrained_layout=True)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.ax1 = self.fig.add_subplot(211)  # donaciones
+        self.ax2 = self.fig.add_subplot(212)  # tipos
+        (self.line,) = self.ax1.plot([], [], marker="o")
+        self.bars = None
+
+        self.ax1.tick_params(axis="x", rotation=25, labelsize=8)
+        self.ax1.tick_params(axis="y", labelsize=8)
+        self.ax1.yaxis.set_major_locator(MaxNLocator(nbins=4))
+        self.ax1.grid(axis="y", alpha=0.2)
+        self.ax2.set_title("Animales por tipo", fontsize=12)
+        self.ax2.set_xlabel("Cantidad", fontsize=10)
+        self.ax2.tick_params(axis="x", labelsize=9)
+        self.ax2.tick_params(axis="y", labelsize=9)
+        self.ax2.xaxis.set_major_locator(MaxNLocator(integer=True))
+        self.ax2.grid(axis="x", alpha=0.2)
+
+    # ---------- API ----------
+    def show(self, donaciones, tipos, months):
+        """Pide dibujar las series ((etiquetas, valores) cada una)."""
+        self._series = (tuple(donaciones[0]), tuple(donaciones[1]),
+                        tuple(tipos[0]), tuple(tipos[1]), months)
+        self._request()
+
+    # ---------- interno (hilo de Tk) ----------
+    def _size(self):
+        w, h = self.winfo_width(), self.winfo_height()
+        if w <= 1 or h <= 1:  # aún sin geometría: el tamaño de la figura
+            w, h = (int(v * self.dpi) for v in FIGSIZE)
+        return w, h
+
+    def _request(self):
+        if self._series is None:
+            return
+        job = (self._series, self._size())
+        if job == self._drawn:
+            return  # mismos datos y tamaño: la imagen actual sirve
+        self._drawn = job
+        self.loader.submit("draw", lambda: self._draw(*job), self._blit)
+
+    def _on_resize(self, _e):
+        if self._after is not None:
+            self.after_cancel(self._after)
+        self._after = self.after(RESIZE_MS, self._resized)
+
+    def _resized(self):
+        self._after = None
+        self._request()
+
+    def _blit(self, ppm):
+        self._img = tk.PhotoImage(data=ppm, format="PPM")
+        self.configure(image=self._img)
+
+    # ---------- interno (hilo del pool) ----------
+    def _draw(self, series, size):
+        import numpy as np
+
+        l, v, l2, v2, months = series
+        with self._lock:
+            if self.fig is None:
+                self._build_figure()
+            x = list(range(len(l)))
+            step = max(1, -(-len(l) // MAX_XTICKS))
+            self.line.set_data(x, v)
+            self.ax1.set_xticks(x, [lab if i % step == 0 else "" for i, lab in enumerate(l)])
+            self.ax1.set_title(f"Donaciones últimos {months} meses", fontsize=12)
+            self.ax1.relim()
+            self.ax1.autoscale_view()
+
+            y = list(range(len(l2)))
+            if self.bars is not None and len(self.bars) == len(v2):
+                for rect, val in zip(self.bars, v2[::-1]):
+                    rect.set_width(val)
+            else:
+                if self.bars is not None:
+                    self.bars.remove()
+                self.bars = self.ax2.barh(y, v2[::-1], color="C0")
+            self.ax2.set_yticks(y, l2[::-1])
+            self.ax2.relim()
+            self.ax2.autoscale_view()
+
+            w, h = size
+            self.fig.set_size_inches(w / self.dpi, h / self.dpi)
+            self.canvas.draw()
+            rgba = np.asarray(self.canvas.buffer_rgba())
+            rows, cols = rgba.shape[:2]
+            return b"P6 %d %d 255\n" % (cols, rows) + rgba[:, :, :3].tobytes()
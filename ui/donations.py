@@ -1,21 +1,37 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from ttkbootstrap.widgets import DateEntry
-from db import get_conn
-from ui.theme import zebra_fill, paint_rows
+from db import query_one, transaction, parse_date, Freshness
+from paging import Listing, KeysetSource
+from lookups import ANIMALS, SPONSORS
+from ui.async_loader import AsyncLoader
+from ui.virtual_table import VirtualTable
+from ui.typeahead import TypeaheadCombobox, PrefixIndex
+from ui.theme import zebra_fill
 from ui.rounded import RoundedCard
 
 BTN_W = 14  # ancho uniforme de botones de acciones
 
+# Listado paginado; cada orden tiene su índice (ver db._m005_sort_indexes)
+DONATIONS = Listing(
+    select="d.id, d.fecha, s.nombre AS padrino, a.nombre AS animal, d.monto, d.metodo",
+    table="donations d",
+    joins="JOIN sponsors s ON s.id = d.sponsor_id LEFT JOIN animals a ON a.id = d.animal_id",
+    sorts={"id": "d.id", "fecha": "d.fecha", "monto": "d.monto"},
+    id_col="d.id",
+)
+
 
 class DonationsFrame(ttk.Frame):
     def __init__(self, master):
         super().__init__(master, padding=10)
         self.sel_id = None
+        self.sort = ("id", True)  # (columna, descendente)
+        self.fresh = Freshness()
+        self.loader = AsyncLoader(self)
 
         self._build_ui()
-        self.load_lookups()
-        self.load_data()
+        self.refresh()
         self._set_mode("new")
 
     # ---------------- UI ----------------
@@ -53,9 +69,9 @@ class DonationsFrame(ttk.Frame):
 
         self.fecha = DateEntry(form, bootstyle="info", dateformat="%Y-%m-%d", width=12)
         self.fecha.grid(row=1, column=0, sticky="ew", padx=(0,8))
-        self.cmb_sponsor = ttk.Combobox(form, state="readonly")
+        self.cmb_sponsor = TypeaheadCombobox(form)
         self.cmb_sponsor.grid(row=1, column=1, sticky="ew", padx=(0,8))
-        self.cmb_animal  = ttk.Combobox(form, state="readonly")
+        self.cmb_animal  = TypeaheadCombobox(form)
         self.cmb_animal.grid(row=1, column=2, sticky="ew", padx=(0,8))
         ttk.Entry(form, textvariable=self.monto).grid(row=1, column=3, sticky="ew", padx=(0,8))
         ttk.Entry(form, textvariable=self.metodo).grid(row=1, column=4, sticky="ew")
@@ -79,7 +95,7 @@ class DonationsFrame(ttk.Frame):
         table_card = RoundedCard(self)
         table_card.grid(row=1, column=0, sticky="nsew", pady=(8,0))
 
-        self.tv = ttk.Treeview(
+        self.tv = VirtualTable(
             table_card.body,
             columns=("id","fecha","padrino","animal","monto","metodo"),
             show="headings", height=16, style="Modern.Treeview"
@@ -90,6 +106,8 @@ class DonationsFrame(ttk.Frame):
         self.tv.column("id", width=60, anchor="center")
         self.tv.grid(row=0, column=0, sticky="nsew")
         self.tv.bind("<<TreeviewSelect>>", self.on_select)
+        self.tv.sortable(DONATIONS.sorts, self.sort_by)
+        self.tv.show_sort(*self.sort)
         zebra_fill(self.tv)
         table_card.body.rowconfigure(0, weight=1)
         table_card.body.columnconfigure(0, weight=1)
@@ -127,36 +145,34 @@ class DonationsFrame(ttk.Frame):
 
     # ---------------- Lookups / Tabla ----------------
     def _fmt(self, table, id_):
-        conn = get_conn(); cur = conn.cursor()
-        if table == "sponsors":
-            n = cur.execute("SELECT nombre FROM sponsors WHERE id=?", (id_,)).fetchone()["nombre"]
-        else:
-            n = cur.execute("SELECT nombre FROM animals WHERE id=?", (id_,)).fetchone()["nombre"]
-        conn.close()
-        return f"{id_} - {n}"
+        return (SPONSORS if table == "sponsors" else ANIMALS).label(id_)
 
     def load_lookups(self):
-        conn = get_conn(); cur = conn.cursor()
-        sponsors = cur.execute("SELECT id, nombre FROM sponsors ORDER BY nombre").fetchall()
-        animals  = cur.execute("SELECT id, nombre FROM animals ORDER BY nombre").fetchall()
-        self.cmb_sponsor["values"] = [f"{r['id']} - {r['nombre']}" for r in sponsors]
-        self.cmb_animal["values"]  = [""] + [f"{r['id']} - {r['nombre']}" for r in animals]
-        conn.close()
+        self.loader.submit("lookups",
+                           lambda: (PrefixIndex(SPONSORS.labels()), PrefixIndex(ANIMALS.labels())),
+                           self._render_lookups)
+
+    def _render_lookups(self, result):
+        sponsors, animals = result
+        self.cmb_sponsor["values"] = sponsors
+        self.cmb_animal["values"]  = animals
+        self.fresh.loaded("lookups")
 
     def load_data(self):
-        conn = get_conn(); cur = conn.cursor()
-        rows = cur.execute("""
-            SELECT d.id, d.fecha, s.nombre AS padrino, a.nombre AS animal, d.monto, d.metodo
-            FROM donations d
-            JOIN sponsors s ON s.id = d.sponsor_id
-            LEFT JOIN animals a ON a.id = d.animal_id
-            ORDER BY d.id DESC
-        """).fetchall()
-        self.tv.delete(*self.tv.get_children())
-        for r in rows:
-            self.tv.insert("", "end", values=(r["id"], r["fecha"], r["padrino"], r["animal"], r["monto"], r["metodo"]))
-        conn.close()
-        paint_rows(self.tv)
+        sort, desc = self.sort
+        self.loader.submit("data", lambda: KeysetSource(DONATIONS, sort=sort, desc=desc),
+                           self._render_data)
+
+    def _render_data(self, source):
+        self.tv.set_source(source)
+        self.fresh.loaded("data")
+
+    def sort_by(self, col):
+        """Clic en encabezado: mismo campo invierte el sentido; otro, descendente."""
+        cur, desc = self.sort
+        self.sort = (col, not desc) if col == cur else (col, True)
+        self.tv.show_sort(*self.sort)
+        self.load_data()
 
     # ---------------- Selección / CRUD ----------------
     def on_select(self, _):
@@ -165,9 +181,7 @@ class DonationsFrame(ttk.Frame):
         v = self.tv.item(sel[0], "values")
         self.sel_id = int(v[0])
 
-        conn = get_conn(); cur = conn.cursor()
-        r = cur.execute("SELECT * FROM donations WHERE id=?", (self.sel_id,)).fetchone()
-        conn.close()
+        r = query_one("SELECT * FROM donations WHERE id=?", (self.sel_id,))
         if not r: return
 
         try:
@@ -186,47 +200,66 @@ class DonationsFrame(ttk.Frame):
         self._set_mode("edit")
 
     def save(self):
-        if not self.fecha.entry.get().strip() or not self.cmb_sponsor.get().strip():
+        if not self.fecha.entry.get().strip() or self.cmb_sponsor.selected_id() is None:
             messagebox.showwarning("Falta", "Fecha y Padrino son obligatorios"); return
-        sponsor_id = int(self.cmb_sponsor.get().split(" - ")[0])
-        animal_id = int(self.cmb_animal.get().split(" - ")[0]) if self.cmb_animal.get().strip() else None
-
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO donations(fecha, sponsor_id, animal_id, monto, metodo, nota)
-            VALUES(?,?,?,?,?,?)
-        """, (self.fecha.entry.get().strip(), sponsor_id, animal_id,
-              float(self.monto.get() or 0.0), self.metodo.get().strip(), self.nota.get().strip()))
-        conn.commit(); conn.close()
+        try:
+            fecha = parse_date(self.fecha.entry.get(), required=True)
+        except ValueError as e:
+            messagebox.showwarning("Fecha", str(e)); return
+        sponsor_id = self.cmb_sponsor.selected_id()
+        animal_id = self.cmb_animal.selected_id()
+
+        with transaction("donations") as conn:
+            new_id = conn.execute("""
+                INSERT INTO donations(fecha, sponsor_id, animal_id, monto, metodo, nota)
+                VALUES(?,?,?,?,?,?)
+            """, (fecha, sponsor_id, animal_id,
+                  float(self.monto.get() or 0.0), self.metodo.get().strip(), self.nota.get().strip())).lastrowid
         self.new()
-        self.load_data()
+        self._patch(lambda: self.tv.insert_row(self.tv.source.fetch(new_id)))
 
     def update(self):
         if not self.sel_id: return
-        sponsor_id = int(self.cmb_sponsor.get().split(" - ")[0]) if self.cmb_sponsor.get().strip() else None
-        animal_id = int(self.cmb_animal.get().split(" - ")[0]) if self.cmb_animal.get().strip() else None
-
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            UPDATE donations
-               SET fecha=?, sponsor_id=?, animal_id=?, monto=?, metodo=?, nota=?
-             WHERE id=?
-        """, (self.fecha.entry.get().strip(), sponsor_id, animal_id,
-              float(self.monto.get() or 0.0), self.metodo.get().strip(), self.nota.get().strip(), self.sel_id))
-        conn.commit(); conn.close()
+        sid, index = self.sel_id, self.tv.selected_index()
+        try:
+            fecha = parse_date(self.fecha.entry.get(), required=True)
+        except ValueError as e:
+            messagebox.showwarning("Fecha", str(e)); return
+        sponsor_id = self.cmb_sponsor.selected_id()
+        animal_id = self.cmb_animal.selected_id()
+
+        with transaction("donations") as conn:
+            conn.execute("""
+                UPDATE donations
+                   SET fecha=?, sponsor_id=?, animal_id=?, monto=?, metodo=?, nota=?
+                 WHERE id=?
+            """, (fecha, sponsor_id, animal_id,
+                  float(self.monto.get() or 0.0), self.metodo.get().strip(), self.nota.get().strip(), sid))
         self.new()
-        self.load_data()
+        self._patch(None if index is None else
+                    lambda: self.tv.update_row(index, self.tv.source.fetch(sid)))
 
     def delete(self):
         if not self.sel_id: return
         if not messagebox.askyesno("Eliminar", "¿Eliminar donación seleccionada?"): return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("DELETE FROM donations WHERE id=?", (self.sel_id,))
-        conn.commit(); conn.close()
+        index = self.tv.selected_index()
+        with transaction("donations") as conn:
+            conn.execute("DELETE FROM donations WHERE id=?", (self.sel_id,))
         self.new()
-        self.load_data()
+        self._patch(None if index is None else lambda: self.tv.delete_row(index))
+
+    def _patch(self, change):
+        """Aplica un alta/edición/baja directo sobre la tabla, sin recargarla.
+        Si hay una carga en curso (o no se sabe qué fila era) se recarga entera."""
+        if change is not None and not self.loader.busy("data"):
+            change()
+            self.fresh.mark("data", "donations", "sponsors", "animals")
+        self.refresh()
 
     # ---------------- API público ----------------
     def refresh(self):
-        self.load_lookups()
-        self.load_data()
+        """Recarga solo lo que cambió desde la última vez que se mostró."""
+        if self.fresh.stale("lookups", "sponsors", "animals"):
+            self.load_lookups()
+        if self.fresh.stale("data", "donations", "sponsors", "animals"):
+            self.load_data()
@@ -1,14 +1,35 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import date, timedelta, datetime
+from datetime import date
 from ttkbootstrap.widgets import DateEntry
 
-from db import get_conn
+import reminders
+from db import query_one, transaction, parse_date, Freshness
+from paging import Listing, KeysetSource
+from lookups import ANIMALS
+from ui.async_loader import AsyncLoader
+from ui.virtual_table import VirtualTable
+from ui.typeahead import TypeaheadCombobox, PrefixIndex
 from ui.rounded import RoundedCard
-from ui.theme import zebra_fill, paint_rows
+from ui.theme import zebra_fill
 
 BTN_W = 12  # botones un poco más compactos
 
+VACCINES = Listing(
+    select="v.id, a.nombre AS animal, v.vacuna, v.fecha_aplicacion, v.proxima_fecha",
+    table="vaccines v",
+    joins="JOIN animals a ON a.id=v.animal_id",
+    sorts={"id": "v.id"},
+    id_col="v.id",
+)
+DEWORMINGS = Listing(
+    select="d.id, a.nombre AS animal, d.producto, d.fecha_aplicacion, d.proxima_fecha",
+    table="dewormings d",
+    joins="JOIN animals a ON a.id=d.animal_id",
+    sorts={"id": "d.id"},
+    id_col="d.id",
+)
+
 
 class HealthFrame(ttk.Frame):
     def __init__(self, master):
@@ -16,13 +37,11 @@ class HealthFrame(ttk.Frame):
 
         self.sel_vac_id = None
         self.sel_dew_id = None
-        self.animals_cache = []
+        self.fresh = Freshness()
+        self.loader = AsyncLoader(self)
 
         self._build_ui()
-        self.load_lookups()
-        self.load_pending()
-        self.load_vaccines()
-        self.load_deworms()
+        self.refresh()
         self._set_v_mode("new")
         self._set_d_mode("new")
 
@@ -41,9 +60,11 @@ class HealthFrame(ttk.Frame):
         )
 
         self.pending_tv = ttk.Treeview(
-            top.body, columns=("tipo", "animal", "proxima", "dias"), show="headings", height=6, style="Modern.Treeview"
+            top.body, columns=("tipo", "animal", "producto", "proxima", "dias"), show="headings", height=6,
+            style="Modern.Treeview"
         )
-        for c, t in [("tipo", "Tipo"), ("animal", "Animal"), ("proxima", "Próxima"), ("dias", "Días")]:
+        for c, t in [("tipo", "Tipo"), ("animal", "Animal"), ("producto", "Producto"),
+                     ("proxima", "Próxima"), ("dias", "Días")]:
             self.pending_tv.heading(c, text=t)
         self.pending_tv.grid(row=1, column=0, sticky="nsew", pady=(6, 0))
         zebra_fill(self.pending_tv)
@@ -72,7 +93,7 @@ class HealthFrame(ttk.Frame):
         ttk.Label(v_form, text="Aplicación").grid(row=0, column=2, sticky="w", padx=(0, 4))
         ttk.Label(v_form, text="Próxima").grid(row=0, column=3, sticky="w", padx=(0, 4))
 
-        self.v_animal = ttk.Combobox(v_form, state="readonly")
+        self.v_animal = TypeaheadCombobox(v_form)
         self.v_animal.grid(row=1, column=0, sticky="ew", padx=(0, 8))
         self.v_vacuna = tk.StringVar()
         ttk.Entry(v_form, textvariable=self.v_vacuna).grid(row=1, column=1, sticky="ew", padx=(0, 8))
@@ -99,7 +120,7 @@ class HealthFrame(ttk.Frame):
         ttk.Separator(vac_card.body, orient="horizontal").grid(row=2, column=0, sticky="ew", pady=(2, 6))
 
         # tabla vacunas
-        self.v_tv = ttk.Treeview(
+        self.v_tv = VirtualTable(
             vac_card.body, columns=("id", "animal", "vacuna", "aplic", "next"), show="headings", height=8, style="Modern.Treeview"
         )
         for c, t in [("id", "ID"), ("animal", "Animal"), ("vacuna", "Vacuna"), ("aplic", "Aplicación"), ("next", "Próxima")]:
@@ -134,7 +155,7 @@ class HealthFrame(ttk.Frame):
         ttk.Label(d_form, text="Aplicación").grid(row=0, column=2, sticky="w", padx=(0, 4))
         ttk.Label(d_form, text="Próxima").grid(row=0, column=3, sticky="w", padx=(0, 4))
 
-        self.d_animal = ttk.Combobox(d_form, state="readonly")
+        self.d_animal = TypeaheadCombobox(d_form)
         self.d_animal.grid(row=1, column=0, sticky="ew", padx=(0, 8))
         self.d_prod = tk.StringVar()
         ttk.Entry(d_form, textvariable=self.d_prod).grid(row=1, column=1, sticky="ew", padx=(0, 8))
@@ -159,7 +180,7 @@ class HealthFrame(ttk.Frame):
 
         ttk.Separator(dew_card.body, orient="horizontal").grid(row=2, column=0, sticky="ew", pady=(2, 6))
 
-        self.d_tv = ttk.Treeview(
+        self.d_tv = VirtualTable(
             dew_card.body, columns=("id", "animal", "producto", "aplic", "next"), show="headings", height=8, style="Modern.Treeview"
         )
         for c, t in [("id", "ID"), ("animal", "Animal"), ("producto", "Producto"), ("aplic", "Aplicación"), ("next", "Próxima")]:
@@ -201,67 +222,39 @@ class HealthFrame(ttk.Frame):
 
     # ===================== datos base =====================
     def load_lookups(self):
-        conn = get_conn()
-        cur = conn.cursor()
-        self.animals_cache = cur.execute("SELECT id, nombre FROM animals ORDER BY nombre").fetchall()
-        values = [f"{r['id']} - {r['nombre']}" for r in self.animals_cache]
+        self.loader.submit("lookups", lambda: PrefixIndex(ANIMALS.labels()), self._render_lookups)
+
+    def _render_lookups(self, values):
         for cmb in (self.v_animal, self.d_animal):
             cmb["values"] = values
-        conn.close()
+        self.fresh.loaded("lookups")
 
     # ===================== pendientes =====================
     def load_pending(self, days=30):
-        """Solo próximos entre hoy y hoy+days; NO muestra vencidos ni días negativos."""
-        self.pending_tv.delete(*self.pending_tv.get_children())
+        """Vencidos recientes y próximos hasta hoy+days (última dosis de cada producto)."""
         today = date.today()
-        limit = today + timedelta(days=days)
-        rows = []
-
-        conn = get_conn()
-        cur = conn.cursor()
-        for table, label in [("vaccines", "Vacuna"), ("dewormings", "Desparasitación")]:
-            q = f"""
-                SELECT '{label}' as tipo, a.nombre as animal, t.proxima_fecha
-                FROM {table} t JOIN animals a ON a.id=t.animal_id
-                WHERE t.proxima_fecha IS NOT NULL AND t.proxima_fecha <> ''
-            """
-            for r in cur.execute(q):
-                try:
-                    d = datetime.strptime(r["proxima_fecha"], "%Y-%m-%d").date()
-                    if today <= d <= limit:
-                        rows.append((label, r["animal"], d))
-                except Exception:
-                    pass
-        conn.close()
-
-        rows.sort(key=lambda x: x[2])
-        for t, animal, d in rows:
-            delta = (d - today).days
-            tag = "soon" if delta <= 7 else "ok"
-            self.pending_tv.insert("", "end", values=(t, animal, d.isoformat(), delta), tags=(tag,))
-        # Colores (solo dos estados)
+        self.loader.submit("pending", lambda: reminders.due(today, days),
+                           lambda rows: self._render_pending(rows, today))
+
+    def _render_pending(self, rows, today):
+        self.pending_tv.delete(*self.pending_tv.get_children())
+        for r in rows:
+            self.pending_tv.insert("", "end", values=(r.tipo, r.animal, r.producto, r.fecha.isoformat(),
+                                                      r.days(today)), tags=(r.status(today),))
+        self.pending_tv.tag_configure("late", background="#FEE2E2")
         self.pending_tv.tag_configure("soon", background="#FEF3C7")
         self.pending_tv.tag_configure("ok", background="#F2F6FB")
-        paint_rows(self.pending_tv)
+        # sin paint_rows: el cebreado pisaría los tags de estado (vencido / próximo)
+        self.fresh.loaded(("pending", today))
 
     # ===================== vacunas =====================
     def load_vaccines(self):
-        conn = get_conn()
-        cur = conn.cursor()
-        rows = cur.execute(
-            """
-            SELECT v.id, a.nombre AS animal, v.vacuna, v.fecha_aplicacion, v.proxima_fecha
-            FROM vaccines v JOIN animals a ON a.id=v.animal_id
-            ORDER BY v.id DESC
-        """
-        ).fetchall()
-        self.v_tv.delete(*self.v_tv.get_children())
-        for r in rows:
-            self.v_tv.insert(
-                "", "end", values=(r["id"], r["animal"], r["vacuna"], r["fecha_aplicacion"], r["proxima_fecha"])
-            )
-        conn.close()
-        paint_rows(self.v_tv)
+        self.loader.submit("vaccines", lambda: KeysetSource(VACCINES),
+                           lambda src: self._render_table("vaccines", self.v_tv, src))
+
+    def _render_table(self, key, tv, source):
+        tv.set_source(source)
+        self.fresh.loaded(key)
 
     def on_select_vaccine(self, _):
         sel = self.v_tv.selection()
@@ -270,10 +263,7 @@ class HealthFrame(ttk.Frame):
         v = self.v_tv.item(sel[0], "values")
         self.sel_vac_id = int(v[0])
 
-        conn = get_conn()
-        cur = conn.cursor()
-        r = cur.execute("SELECT * FROM vaccines WHERE id=?", (self.sel_vac_id,)).fetchone()
-        conn.close()
+        r = query_one("SELECT * FROM vaccines WHERE id=?", (self.sel_vac_id,))
         if not r:
             return
 
@@ -303,90 +293,75 @@ class HealthFrame(ttk.Frame):
         self._set_v_mode("new")
 
     def v_save(self):
-        if not self.v_animal.get().strip() or not self.v_vacuna.get().strip():
+        if self.v_animal.selected_id() is None or not self.v_vacuna.get().strip():
             messagebox.showwarning("Falta", "Animal y Vacuna son obligatorios")
             return
-        animal_id = int(self.v_animal.get().split(" - ")[0])
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO vaccines(animal_id, vacuna, fecha_aplicacion, proxima_fecha, notas)
-            VALUES(?,?,?,?,?)
-        """,
-            (
-                animal_id,
-                self.v_vacuna.get().strip(),
-                self.v_aplic.entry.get().strip(),
-                self.v_next.entry.get().strip(),
-                self.v_notas.get().strip(),
-            ),
-        )
-        conn.commit()
-        conn.close()
+        animal_id = self.v_animal.selected_id()
+        fechas = self._read_dates(self.v_aplic, self.v_next)
+        if not fechas:
+            return
+        aplic, proxima = fechas
+        with transaction("vaccines") as conn:
+            new_id = conn.execute(
+                """
+                INSERT INTO vaccines(animal_id, vacuna, fecha_aplicacion, proxima_fecha, notas)
+                VALUES(?,?,?,?,?)
+            """,
+                (
+                    animal_id,
+                    self.v_vacuna.get().strip(),
+                    aplic,
+                    proxima,
+                    self.v_notas.get().strip(),
+                ),
+            ).lastrowid
         self.v_new()
-        self.load_vaccines()
-        self.load_pending()
+        self._patch("vaccines", self.v_tv, lambda: self.v_tv.insert_row(self.v_tv.source.fetch(new_id)))
 
     def v_update(self):
         if not self.sel_vac_id:
             return
-        animal_id = int(self.v_animal.get().split(" - ")[0]) if self.v_animal.get().strip() else None
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            UPDATE vaccines
-               SET animal_id=?, vacuna=?, fecha_aplicacion=?, proxima_fecha=?, notas=?
-             WHERE id=?
-        """,
-            (
-                animal_id,
-                self.v_vacuna.get().strip(),
-                self.v_aplic.entry.get().strip(),
-                self.v_next.entry.get().strip(),
-                self.v_notas.get().strip(),
-                self.sel_vac_id,
-            ),
-        )
-        conn.commit()
-        conn.close()
+        vid, index = self.sel_vac_id, self.v_tv.selected_index()
+        animal_id = self.v_animal.selected_id()
+        fechas = self._read_dates(self.v_aplic, self.v_next)
+        if not fechas:
+            return
+        aplic, proxima = fechas
+        with transaction("vaccines") as conn:
+            conn.execute(
+                """
+                UPDATE vaccines
+                   SET animal_id=?, vacuna=?, fecha_aplicacion=?, proxima_fecha=?, notas=?
+                 WHERE id=?
+            """,
+                (
+                    animal_id,
+                    self.v_vacuna.get().strip(),
+                    aplic,
+                    proxima,
+                    self.v_notas.get().strip(),
+                    vid,
+                ),
+            )
         self.v_new()
-        self.load_vaccines()
-        self.load_pending()
+        self._patch("vaccines", self.v_tv, None if index is None else
+                    lambda: self.v_tv.update_row(index, self.v_tv.source.fetch(vid)))
 
     def v_delete(self):
         if not self.sel_vac_id:
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar registro de vacuna?"):
             return
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM vaccines WHERE id=?", (self.sel_vac_id,))
-        conn.commit()
-        conn.close()
+        index = self.v_tv.selected_index()
+        with transaction("vaccines") as conn:
+            conn.execute("DELETE FROM vaccines WHERE id=?", (self.sel_vac_id,))
         self.v_new()
-        self.load_vaccines()
-        self.load_pending()
+        self._patch("vaccines", self.v_tv, None if index is None else lambda: self.v_tv.delete_row(index))
 
     # ===================== desparasitaciones =====================
     def load_deworms(self):
-        conn = get_conn()
-        cur = conn.cursor()
-        rows = cur.execute(
-            """
-            SELECT d.id, a.nombre AS animal, d.producto, d.fecha_aplicacion, d.proxima_fecha
-            FROM dewormings d JOIN animals a ON a.id=d.animal_id
-            ORDER BY d.id DESC
-        """
-        ).fetchall()
-        self.d_tv.delete(*self.d_tv.get_children())
-        for r in rows:
-            self.d_tv.insert(
-                "", "end", values=(r["id"], r["animal"], r["producto"], r["fecha_aplicacion"], r["proxima_fecha"])
-            )
-        conn.close()
-        paint_rows(self.d_tv)
+        self.loader.submit("deworms", lambda: KeysetSource(DEWORMINGS),
+                           lambda src: self._render_table("deworms", self.d_tv, src))
 
     def on_select_deworm(self, _):
         sel = self.d_tv.selection()
@@ -394,10 +369,7 @@ class HealthFrame(ttk.Frame):
             return
         v = self.d_tv.item(sel[0], "values")
         self.sel_dew_id = int(v[0])
-        conn = get_conn()
-        cur = conn.cursor()
-        r = cur.execute("SELECT * FROM dewormings WHERE id=?", (self.sel_dew_id,)).fetchone()
-        conn.close()
+        r = query_one("SELECT * FROM dewormings WHERE id=?", (self.sel_dew_id,))
         if not r:
             return
 
@@ -427,88 +399,103 @@ class HealthFrame(ttk.Frame):
         self._set_d_mode("new")
 
     def d_save(self):
-        if not self.d_animal.get().strip() or not self.d_prod.get().strip():
+        if self.d_animal.selected_id() is None or not self.d_prod.get().strip():
             messagebox.showwarning("Falta", "Animal y Producto son obligatorios")
             return
-        animal_id = int(self.d_animal.get().split(" - ")[0])
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO dewormings(animal_id, producto, fecha_aplicacion, proxima_fecha, notas)
-            VALUES(?,?,?,?,?)
-        """,
-            (
-                animal_id,
-                self.d_prod.get().strip(),
-                self.d_aplic.entry.get().strip(),
-                self.d_next.entry.get().strip(),
-                self.d_notas.get().strip(),
-            ),
-        )
-        conn.commit()
-        conn.close()
+        animal_id = self.d_animal.selected_id()
+        fechas = self._read_dates(self.d_aplic, self.d_next)
+        if not fechas:
+            return
+        aplic, proxima = fechas
+        with transaction("dewormings") as conn:
+            new_id = conn.execute(
+                """
+                INSERT INTO dewormings(animal_id, producto, fecha_aplicacion, proxima_fecha, notas)
+                VALUES(?,?,?,?,?)
+            """,
+                (
+                    animal_id,
+                    self.d_prod.get().strip(),
+                    aplic,
+                    proxima,
+                    self.d_notas.get().strip(),
+                ),
+            ).lastrowid
         self.d_new()
-        self.load_deworms()
-        self.load_pending()
+        self._patch("deworms", self.d_tv, lambda: self.d_tv.insert_row(self.d_tv.source.fetch(new_id)))
 
     def d_update(self):
         if not self.sel_dew_id:
             return
-        animal_id = int(self.d_animal.get().split(" - ")[0]) if self.d_animal.get().strip() else None
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute(
-            """
-            UPDATE dewormings
-               SET animal_id=?, producto=?, fecha_aplicacion=?, proxima_fecha=?, notas=?
-             WHERE id=?
-        """,
-            (
-                animal_id,
-                self.d_prod.get().strip(),
-                self.d_aplic.entry.get().strip(),
-                self.d_next.entry.get().strip(),
-                self.d_notas.get().strip(),
-                self.sel_dew_id,
-            ),
-        )
-        conn.commit()
-        conn.close()
+        did, index = self.sel_dew_id, self.d_tv.selected_index()
+        animal_id = self.d_animal.selected_id()
+        fechas = self._read_dates(self.d_aplic, self.d_next)
+        if not fechas:
+            return
+        aplic, proxima = fechas
+        with transaction("dewormings") as conn:
+            conn.execute(
+                """
+                UPDATE dewormings
+                   SET animal_id=?, producto=?, fecha_aplicacion=?, proxima_fecha=?, notas=?
+                 WHERE id=?
+            """,
+                (
+                    animal_id,
+                    self.d_prod.get().strip(),
+                    aplic,
+                    proxima,
+                    self.d_notas.get().strip(),
+                    did,
+                ),
+            )
         self.d_new()
-        self.load_deworms()
-        self.load_pending()
+        self._patch("deworms", self.d_tv, None if index is None else
+                    lambda: self.d_tv.update_row(index, self.d_tv.source.fetch(did)))
 
     def d_delete(self):
         if not self.sel_dew_id:
             return
         if not messagebox.askyesno("Eliminar", "¿Eliminar registro de desparasitación?"):
             return
-        conn = get_conn()
-        cur = conn.cursor()
-        cur.execute("DELETE FROM dewormings WHERE id=?", (self.sel_dew_id,))
-        conn.commit()
-        conn.close()
+        index = self.d_tv.selected_index()
+        with transaction("dewormings") as conn:
+            conn.execute("DELETE FROM dewormings WHERE id=?", (self.sel_dew_id,))
         self.d_new()
-        self.load_deworms()
-        self.load_pending()
+        self._patch("deworms", self.d_tv, None if index is None else lambda: self.d_tv.delete_row(index))
 
     # ===================== helpers =====================
+    def _patch(self, key, tv, change):
+        """Aplica un alta/edición/baja directo sobre la tabla `key`, sin
+        recargarla (los pendientes sí se recalculan en refresh).
+        Si hay una carga en curso (o no se sabe qué fila era) se recarga entera."""
+        if change is not None and not self.loader.busy(key):
+            change()
+            table = "vaccines" if key == "vaccines" else "dewormings"
+            self.fresh.mark(key, table, "animals")
+        self.refresh()
+
+    def _read_dates(self, aplic_entry, next_entry):
+        """Valida y normaliza (aplicación, próxima). None si alguna es inválida."""
+        try:
+            return (parse_date(aplic_entry.entry.get(), required=True),
+                    parse_date(next_entry.entry.get()))
+        except ValueError as e:
+            messagebox.showwarning("Fecha", str(e))
+            return None
+
     def _fmt_animal(self, animal_id: int | None) -> str:
-        if not animal_id:
-            return ""
-        for r in self.animals_cache:
-            if r["id"] == animal_id:
-                return f"{r['id']} - {r['nombre']}"
-        conn = get_conn()
-        cur = conn.cursor()
-        n = cur.execute("SELECT nombre FROM animals WHERE id=?", (animal_id,)).fetchone()
-        conn.close()
-        return f"{animal_id} - {n['nombre'] if n else ''}"
+        return ANIMALS.label(animal_id)
 
     # API público
     def refresh(self):
-        self.load_lookups()
-        self.load_pending()
-        self.load_vaccines()
-        self.load_deworms()
+        """Recarga solo lo que cambió desde la última vez que se mostró
+        (los pendientes también dependen de la fecha de hoy)."""
+        if self.fresh.stale("lookups", "animals"):
+            self.load_lookups()
+        if self.fresh.stale(("pending", date.today()), *reminders.TABLES):
+            self.load_pending()
+        if self.fresh.stale("vaccines", "vaccines", "animals"):
+            self.load_vaccines()
+        if self.fresh.stale("deworms", "dewormings", "animals"):
+            self.load_deworms()
@@ -0,0 +1,56 @@
+# ui/lazy.py
+import importlib
+from tkinter import ttk
+
+
+class LazyModule:
+    """Módulo que se importa recién al usar uno de sus atributos
+    (pd = LazyModule("pandas")). Para que las anotaciones no lo disparen,
+    el módulo que lo usa debe tener `from __future__ import annotations`."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def resolve(factory):
+    """"paquete.modulo:Clase" -> la clase (importando el módulo); otro valor se devuelve igual."""
+    if isinstance(factory, str):
+        module, _, name = factory.partition(":")
+        return getattr(importlib.import_module(module), name)
+    return factory
+
+
+class LazyTab(ttk.Frame):
+    """Contenedor de pestaña que construye el frame real recién la primera vez
+    que se selecciona. Así el arranque no ejecuta las consultas de las
+    pestañas que el usuario todavía no abrió. `factory` puede ser la clase
+    o "modulo:Clase": en ese caso ni siquiera se importa el módulo (ni sus
+    dependencias) hasta entonces."""
+
+    def __init__(self, master, factory):
+        super().__init__(master)
+        self._factory = factory
+        self.frame = None
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+    def ensure_built(self) -> bool:
+        """Construye el frame si hace falta. Devuelve True si lo acaba de crear."""
+        if self.frame is not None:
+            return False
+        self.frame = resolve(self._factory)(self)
+        self.frame.grid(row=0, column=0, sticky="nsew")
+        return True
+
+    def refresh(self):
+        # Recién construido: el constructor ya cargó sus datos
+        if self.ensure_built():
+            return
+        if hasattr(self.frame, "refresh"):
+            self.frame.refresh()
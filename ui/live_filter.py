@@ -0,0 +1,57 @@
+# ui/live_filter.py
+import time
+
+DELAY_MS = 150           # pausa de tecleo antes de consultar
+FILTER_BUDGET_MS = 100   # consulta + pintado, sin contar la pausa
+
+
+class LiveFilter:
+    """Filtra mientras se escribe: cualquier cambio en `variables` programa
+    `apply()` tras DELAY_MS sin nuevas teclas. La consulta la hace el
+    AsyncLoader del frame (que descarta e interrumpe la anterior), y el frame
+    llama done() al pintar el resultado para medir la latencia.
+
+    apply() se omite si los valores no cambiaron desde la última vez (p. ej.
+    un combo que se recarga con el mismo valor)."""
+
+    def __init__(self, widget, apply, *variables, delay=DELAY_MS):
+        self.widget = widget
+        self.apply = apply
+        self.variables = variables
+        self.delay = delay
+        self.last_ms = None      # latencia de la última búsqueda (consulta + pintado)
+        self._after = None
+        self._applied = self._values()
+        self._t0 = None
+        for var in variables:
+            var.trace_add("write", lambda *_: self._schedule())
+
+    def _values(self):
+        return tuple(v.get() for v in self.variables)
+
+    def _schedule(self):
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+        self._after = self.widget.after(self.delay, self._fire)
+
+    def _fire(self):
+        self._after = None
+        if self._values() != self._applied:
+            self.flush()
+
+    def flush(self):
+        """Aplica ya lo escrito (botón Buscar / Enter / Limpiar)."""
+        if self._after is not None:
+            self.widget.after_cancel(self._after)
+            self._after = None
+        self._applied = self._values()
+        self._t0 = time.perf_counter()
+        self.apply()
+
+    def done(self):
+        """El frame pintó el resultado: registra la latencia en last_ms (los
+        tests la comparan con FILTER_BUDGET_MS)."""
+        if self._t0 is None:
+            return
+        self.last_ms = (time.perf_counter() - self._t0) * 1000
+        self._t0 = None
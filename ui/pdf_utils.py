@@ -1,19 +1,176 @@
 # ui/pdf_utils.py
-from tkinter import messagebox
-
-def render_pdf_from_html(html: str, out_path: str) -> bool:
-    """Genera un PDF a partir de un string HTML. Usa WeasyPrint si está disponible,
-    de lo contrario intenta con xhtml2pdf."""
-    try:
-        from weasyprint import HTML  # type: ignore[import-not-found]
-        HTML(string=html).write_pdf(out_path)
-        return True
-    except Exception:
+"""Motor de PDF compartido (reportes, fichas y lotes).
+
+PdfEngine elige el backend una sola vez (WeasyPrint si está instalado, si
+no xhtml2pdf) y guarda lo que cuesta preparar: las plantillas de
+reports/templates ya partidas, el CSS de cada una ya parseado, la
+configuración de fuentes y el logo en base64. Así cada PDF después del
+primero solo paga el render.
+
+Hay un motor por proceso (get_engine()): los hilos lo comparten y cada
+proceso del pool de fichas arma el suyo con el primer trabajo. No muestra
+diálogos: los errores salen como RuntimeError y quien llama avisa desde el
+hilo de Tk.
+"""
+import base64
+import re
+import threading
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = ROOT / "reports" / "templates"
+LOGO_PATH = ROOT / "assets" / "logo.png"
+
+_PLACEHOLDER = re.compile(r"\{([A-Z_]+)\}")
+_SECTION = re.compile(r"\{#([A-Z_]+)\}(.*?)\{/\1\}", re.S)
+_STYLE = re.compile(r"<style[^>]*>(.*?)</style>", re.S | re.I)
+
+
+class Template:
+    """Plantilla HTML con marcadores {NOMBRE}, partida una sola vez.
+    Lo que va entre {#NOMBRE} y {/NOMBRE} solo sale si render() recibe
+    NOMBRE verdadero (p. ej. el encabezado en la primera parte de un reporte).
+    El <style> se separa (`css`) para que el motor lo parsee una vez."""
+
+    def __init__(self, text):
+        self.css = "\n".join(_STYLE.findall(text))
+        body = _STYLE.sub("", text)
+        self._sections = []   # (sección o None, partes partidas por marcador)
+        pos = 0
+        for m in _SECTION.finditer(body):
+            self._sections.append((None, _PLACEHOLDER.split(body[pos:m.start()])))
+            self._sections.append((m.group(1), _PLACEHOLDER.split(m.group(2))))
+            pos = m.end()
+        self._sections.append((None, _PLACEHOLDER.split(body[pos:])))
+
+    def render(self, **values) -> str:
+        # partes pares: texto fijo; impares: nombres de marcadores
+        return "".join(values.get(p, "") if i % 2 else p
+                       for section, parts in self._sections
+                       if section is None or values.get(section)
+                       for i, p in enumerate(parts))
+
+
+class PdfEngine:
+    def __init__(self, templates_dir=TEMPLATES_DIR, logo_path=LOGO_PATH):
+        self.templates_dir = Path(templates_dir)
+        self.logo_path = Path(logo_path)
+        self._init()
+
+    def _init(self):
+        self._lock = threading.RLock()
+        self._backend = None
+        self._templates = {}
+        self._css = {}       # texto CSS -> hoja parseada (WeasyPrint) o CSS final (xhtml2pdf)
+        self._fonts = None
+        self._logo = None
+
+    # Para el pool de procesos: se manda solo la configuración, las cachés
+    # se vuelven a armar del otro lado.
+    def __getstate__(self):
+        return {"templates_dir": self.templates_dir, "logo_path": self.logo_path}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init()
+
+    # ---------- backend ----------
+    @property
+    def backend(self) -> str:
+        """"weasyprint" o "xhtml2pdf" (se decide con el primer uso)."""
+        with self._lock:
+            if self._backend is None:
+                try:
+                    from weasyprint import HTML, CSS  # type: ignore[import-not-found]
+                    from weasyprint.text.fonts import FontConfiguration  # type: ignore[import-not-found]
+                    self._HTML, self._CSS = HTML, CSS
+                    self._fonts = FontConfiguration()
+                    self._backend = "weasyprint"
+                except Exception:
+                    try:
+                        from xhtml2pdf import pisa
+                        from xhtml2pdf.default import DEFAULT_CSS
+                    except ImportError as e:
+                        raise RuntimeError("No se pudo generar PDF: instala WeasyPrint o xhtml2pdf") from e
+                    self._pisa, self._default_css = pisa, DEFAULT_CSS
+                    self._backend = "xhtml2pdf"
+            return self._backend
+
+    def _stylesheet(self, css):
+        with self._lock:
+            sheet = self._css.get(css)
+            if sheet is None:
+                if self.backend == "weasyprint":
+                    sheet = self._CSS(string=css, font_config=self._fonts)
+                else:
+                    sheet = self._default_css + css
+                self._css[css] = sheet
+            return sheet
+
+    # ---------- recursos ----------
+    def template(self, name) -> Template:
+        """Plantilla de reports/templates (se lee y se parte una vez)."""
+        with self._lock:
+            tpl = self._templates.get(name)
+            if tpl is None:
+                tpl = self._templates[name] = Template(
+                    (self.templates_dir / name).read_text(encoding="utf-8"))
+            return tpl
+
+    def logo_uri(self):
+        """El logo como data: URI (None si no hay logo)."""
+        with self._lock:
+            if self._logo is None:
+                try:
+                    data = base64.b64encode(self.logo_path.read_bytes()).decode("ascii")
+                    self._logo = f"data:image/png;base64,{data}"
+                except OSError:
+                    self._logo = ""
+            return self._logo or None
+
+    def warm(self, *templates):
+        """Prepara backend, plantillas y su CSS (p. ej. en segundo plano)."""
+        for name in templates or [p.name for p in self.templates_dir.glob("*.html")]:
+            self._stylesheet(self.template(name).css)
+        self.logo_uri()
+
+    # ---------- render ----------
+    def render(self, html: str, out_path, css: str = ""):
+        """Escribe el PDF de `html` en `out_path`. `css` es la hoja común
+        (de una plantilla o de la ficha): se parsea una vez y se reutiliza."""
+        sheet = self._stylesheet(css) if css else None
         try:
-            from xhtml2pdf import pisa
-            with open(out_path, "wb") as f:
-                pisa.CreatePDF(html, dest=f)
-            return True
+            if self.backend == "weasyprint":
+                self._HTML(string=html, base_url=str(ROOT)).write_pdf(
+                    str(out_path), stylesheets=[sheet] if sheet else None, font_config=self._fonts)
+                return
+            # reportlab guarda estado global: con xhtml2pdf, un render a la vez por proceso
+            with self._lock, open(out_path, "wb") as f:
+                result = self._pisa.CreatePDF(html, dest=f, default_css=sheet)
+            if result.err:
+                raise RuntimeError(f"xhtml2pdf reportó {result.err} error(es)")
+        except RuntimeError:
+            raise
         except Exception as e:
-            messagebox.showerror("PDF", f"No se pudo generar PDF: {e}")
-            return False
+            raise RuntimeError(f"No se pudo generar PDF: {e}") from e
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> PdfEngine:
+    """El motor de este proceso (se crea con el primer uso)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PdfEngine()
+        return _engine
+
+
+def render_pdf_from_html(html: str, out_path: str, css: str = "") -> bool:
+    """Genera un PDF a partir de un string HTML con el motor del proceso.
+    Suele correr en un hilo de trabajo: no muestra diálogos, lanza RuntimeError
+    y quien lo llama avisa desde el hilo de Tk."""
+    get_engine().render(html, out_path, css)
+    return True
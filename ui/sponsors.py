@@ -1,39 +1,40 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from sqlite3 import OperationalError
 from ui.rounded import RoundedCard
-from ui.theme import zebra_fill, paint_rows
-from db import get_conn
+from ui.theme import zebra_fill
+from db import query_one, transaction, Freshness
+from paging import Listing, KeysetSource
+from search import text_filter
+from ui.async_loader import AsyncLoader
+from ui.virtual_table import VirtualTable
+from ui.live_filter import LiveFilter
 
 BTN_W = 14  # ancho uniforme para botones del bloque de acciones
 
+SPONSORS = Listing(
+    select="s.id, s.nombre, COALESCE(s.telefono,'') AS telefono, COALESCE(s.correo,'') AS correo",
+    table="sponsors s",
+    sorts={"id": "s.id", "nombre": "s.nombre"},
+    id_col="s.id",
+)
+
 
 class SponsorsFrame(ttk.Frame):
     def __init__(self, master):
         super().__init__(master, padding=10)
         self.sel_id = None
+        self.sort = ("id", True)  # (columna, descendente)
+        self.fresh = Freshness()
+        self.loader = AsyncLoader(self)
 
         # filtros
         self.q_text = tk.StringVar()
-
-        # === asegura esquema ===
-        self._ensure_schema()
+        self.live = LiveFilter(self, self.apply_filters, self.q_text)
 
         self._build_ui()
-        self.load_sponsors()
+        self.refresh()
         self._set_mode("new")
 
-    # ---------- esquema ----------
-    def _ensure_schema(self):
-        """Si sponsors no tiene 'notas', la agrega."""
-        conn = get_conn(); cur = conn.cursor()
-        cols = cur.execute("PRAGMA table_info(sponsors)").fetchall()
-        colnames = [c["name"] for c in cols]  # row_factory=sqlite3.Row
-        if "notas" not in colnames:
-            cur.execute("ALTER TABLE sponsors ADD COLUMN notas TEXT")
-            conn.commit()
-        conn.close()
-
     # ---------- UI ----------
     def _build_ui(self):
         # Tarjeta principal
@@ -93,18 +94,18 @@ class SponsorsFrame(ttk.Frame):
         ttk.Label(filters, text="Buscar").grid(row=0, column=0, sticky="w", padx=(0,4))
         ent_q = ttk.Entry(filters, textvariable=self.q_text)
         ent_q.grid(row=1, column=0, sticky="ew", padx=(0,8))
-        ent_q.bind("<Return>", lambda _: self.apply_filters())
+        ent_q.bind("<Return>", lambda _: self.live.flush())
 
         btns = ttk.Frame(filters)
         btns.grid(row=1, column=1, sticky="w")
-        ttk.Button(btns, text="Buscar", command=self.apply_filters).grid(row=0, column=0, padx=4)
+        ttk.Button(btns, text="Buscar", command=self.live.flush).grid(row=0, column=0, padx=4)
         ttk.Button(btns, text="Limpiar", command=self.clear_filters).grid(row=0, column=1, padx=4)
 
         self.lbl_count = ttk.Label(filters, text="", foreground="#64748B")
         self.lbl_count.grid(row=1, column=2, sticky="e")
 
         # ----- Tabla -----
-        self.tv = ttk.Treeview(
+        self.tv = VirtualTable(
             card.body,
             columns=("id","nombre","telefono","correo"),
             show="headings", height=16, style="Modern.Treeview"
@@ -114,6 +115,8 @@ class SponsorsFrame(ttk.Frame):
         self.tv.column("id", width=60, anchor="center")
         self.tv.grid(row=4, column=0, sticky="nsew")
         self.tv.bind("<<TreeviewSelect>>", self.on_select)
+        self.tv.sortable(SPONSORS.sorts, self.sort_by)
+        self.tv.show_sort(*self.sort)
         zebra_fill(self.tv)
 
         # layout
@@ -142,37 +145,50 @@ class SponsorsFrame(ttk.Frame):
 
     # ---------- Datos / CRUD ----------
     def _build_where(self):
-        clauses, params = [], []
+        """(listado, WHERE, params); con texto el listado es el de búsqueda (FTS)."""
+        listing, clauses, params = SPONSORS, [], []
         q = self.q_text.get().strip()
         if q:
-            clauses.append("(nombre LIKE ? OR telefono LIKE ? OR correo LIKE ?)")
-            like = f"%{q}%"
-            params += [like, like, like]
+            listing, clause, args = text_filter(SPONSORS, "sponsors", q,
+                                                ("s.nombre", "s.telefono", "s.correo", "s.notas"))
+            if clause:
+                clauses.append(clause)
+                params += args
         where = "WHERE " + " AND ".join(clauses) if clauses else ""
-        return where, params
+        return listing, where, params
 
     def load_sponsors(self):
-        where, params = self._build_where()
-        conn = get_conn(); cur = conn.cursor()
-        rows = cur.execute(f"""
-            SELECT id, nombre, COALESCE(telefono,'') AS telefono, COALESCE(correo,'') AS correo
-            FROM sponsors
-            {where}
-            ORDER BY id DESC
-        """, params).fetchall()
-        self.tv.delete(*self.tv.get_children())
-        for r in rows:
-            self.tv.insert("", "end", values=(r["id"], r["nombre"], r["telefono"], r["correo"]))
-        conn.close()
-        paint_rows(self.tv)
-        self.lbl_count.config(text=f"{len(rows)} resultado(s)")
+        listing, where, params = self._build_where()
+        if self.sort[0] not in listing.sorts:  # "rank" sin búsqueda activa
+            self.sort = ("id", True)
+            self.tv.show_sort(*self.sort)
+        sort, desc = self.sort
+        self.loader.submit("sponsors", lambda: KeysetSource(listing, where, params, sort, desc),
+                           self._render_sponsors)
+
+    def _render_sponsors(self, source):
+        self.tv.set_source(source)
+        self.lbl_count.config(text=f"{len(source)} resultado(s)")
+        self.live.done()
+        self.fresh.loaded("sponsors")
+
+    def sort_by(self, col):
+        """Clic en encabezado: mismo campo invierte el sentido; nombre arranca A-Z."""
+        cur, desc = self.sort
+        self.sort = (col, not desc) if col == cur else (col, col == "id")
+        self.tv.show_sort(*self.sort)
+        self.load_sponsors()
 
     def apply_filters(self):
+        # con búsqueda por texto, los más relevantes primero
+        if "rank" in self._build_where()[0].sorts:
+            self.sort = ("rank", False)
+            self.tv.show_sort(*self.sort)
         self.load_sponsors()
 
     def clear_filters(self):
         self.q_text.set("")
-        self.load_sponsors()
+        self.live.flush()
 
     def on_select(self, _):
         sel = self.tv.selection()
@@ -181,53 +197,59 @@ class SponsorsFrame(ttk.Frame):
         self.sel_id = int(vals[0])
         self.sp_nombre.set(vals[1]); self.sp_tel.set(vals[2]); self.sp_mail.set(vals[3])
 
-        # traer notas si existen (tolerante a esquema)
-        try:
-            conn = get_conn(); cur = conn.cursor()
-            r = cur.execute("SELECT COALESCE(notas,'') notas FROM sponsors WHERE id=?", (self.sel_id,)).fetchone()
-            conn.close()
-            self.sp_notas.set(r["notas"] if r else "")
-        except OperationalError:
-            # por si la DB antigua no tenía la columna
-            self.sp_notas.set("")
+        # traer notas (columna garantizada por la migración 2 de db.py)
+        r = query_one("SELECT COALESCE(notas,'') notas FROM sponsors WHERE id=?", (self.sel_id,))
+        self.sp_notas.set(r["notas"] if r else "")
 
         self._set_mode("edit")
 
     def add_sponsor(self):
         if not self.sp_nombre.get().strip():
             messagebox.showwarning("Falta", "El nombre es obligatorio"); return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO sponsors(nombre, telefono, correo, notas)
-            VALUES(?,?,?,?)
-        """, (self.sp_nombre.get().strip(), self.sp_tel.get().strip(),
-              self.sp_mail.get().strip(), self.sp_notas.get().strip()))
-        conn.commit(); conn.close()
+        with transaction("sponsors") as conn:
+            new_id = conn.execute("""
+                INSERT INTO sponsors(nombre, telefono, correo, notas)
+                VALUES(?,?,?,?)
+            """, (self.sp_nombre.get().strip(), self.sp_tel.get().strip(),
+                  self.sp_mail.get().strip(), self.sp_notas.get().strip())).lastrowid
         self.new_sponsor()
-        self.load_sponsors()
+        self._patch(lambda: self.tv.insert_row(self.tv.source.fetch(new_id)))
 
     def update_sponsor(self):
         if not self.sel_id: return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("""
-            UPDATE sponsors
-            SET nombre=?, telefono=?, correo=?, notas=?
-            WHERE id=?
-        """, (self.sp_nombre.get().strip(), self.sp_tel.get().strip(),
-              self.sp_mail.get().strip(), self.sp_notas.get().strip(), self.sel_id))
-        conn.commit(); conn.close()
+        sid, index = self.sel_id, self.tv.selected_index()
+        with transaction("sponsors") as conn:
+            conn.execute("""
+                UPDATE sponsors
+                SET nombre=?, telefono=?, correo=?, notas=?
+                WHERE id=?
+            """, (self.sp_nombre.get().strip(), self.sp_tel.get().strip(),
+                  self.sp_mail.get().strip(), self.sp_notas.get().strip(), sid))
         self.new_sponsor()
-        self.load_sponsors()
+        self._patch(None if index is None else
+                    lambda: self.tv.update_row(index, self.tv.source.fetch(sid)))
 
     def delete_sponsor(self):
         if not self.sel_id: return
         if not messagebox.askyesno("Eliminar", "¿Eliminar padrino seleccionado?"): return
-        conn = get_conn(); cur = conn.cursor()
-        cur.execute("DELETE FROM sponsors WHERE id=?", (self.sel_id,))
-        conn.commit(); conn.close()
+        index = self.tv.selected_index()
+        with transaction("sponsors") as conn:
+            conn.execute("DELETE FROM sponsors WHERE id=?", (self.sel_id,))
         self.new_sponsor()
-        self.load_sponsors()
+        self._patch(None if index is None else lambda: self.tv.delete_row(index))
+
+    def _patch(self, change):
+        """Aplica un alta/edición/baja directo sobre la lista, sin recargarla.
+        Si hay una carga en curso (o no se sabe qué fila era) se recarga entera;
+        también si se ordena por relevancia, que cambia con cada escritura."""
+        if change is not None and self.sort[0] != "rank" and not self.loader.busy("sponsors"):
+            change()
+            self.lbl_count.config(text=f"{len(self.tv.source)} resultado(s)")
+            self.fresh.mark("sponsors", "sponsors")
+        self.refresh()
 
     # ---------- API público ----------
     def refresh(self):
-        self.load_sponsors()
+        """Recarga solo si hubo cambios desde la última vez que se mostró."""
+        if self.fresh.stale("sponsors", "sponsors"):
+            self.load_sponsors()
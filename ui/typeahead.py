@@ -0,0 +1,209 @@
+# ui/typeahead.py
+import re
+import tkinter as tk
+import unicodedata
+from bisect import bisect_left
+from tkinter import ttk
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes: 'Ñandú' -> 'nandu'."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+class PrefixIndex:
+    """Índice de prefijos por palabra sobre etiquetas "id - nombre".
+
+    Cada palabra (plegada con fold) va a una lista ordenada junto al número de
+    la etiqueta; un prefijo se resuelve con dos bisect. Con varias palabras se
+    busca la más larga en el índice y las demás se verifican sobre esos
+    candidatos. Los resultados salen en el orden original de las etiquetas.
+    Se puede construir en el AsyncLoader y asignar ya armado al combo."""
+
+    def __init__(self, labels=()):
+        self.labels = list(labels)
+        self._pos = {lbl: i for i, lbl in enumerate(self.labels)}
+        self._words = [tuple(_WORD.findall(fold(lbl))) for lbl in self.labels]
+        self._index = sorted((w, i) for i, words in enumerate(self._words) for w in set(words))
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __contains__(self, label):
+        return label in self._pos
+
+    def search(self, text, limit=50):
+        tokens = _WORD.findall(fold(text))
+        if not tokens:
+            return self.labels[:limit]
+        tokens.sort(key=len, reverse=True)
+        first, rest = tokens[0], tokens[1:]
+        lo = bisect_left(self._index, (first,))
+        hi = bisect_left(self._index, (first + "\uffff",))
+
+        def ok(i):
+            return all(any(w.startswith(t) for w in self._words[i]) for t in rest)
+
+        if hi - lo > 20 * limit:
+            # prefijo muy común: recorrer en orden corta apenas hay `limit`
+            out = []
+            for i, words in enumerate(self._words):
+                if any(w.startswith(first) for w in words) and ok(i):
+                    out.append(self.labels[i])
+                    if len(out) == limit:
+                        break
+            return out
+        hits = sorted({i for _w, i in self._index[lo:hi]})
+        return [self.labels[i] for i in hits if ok(i)][:limit]
+
+
+class TypeaheadCombobox(ttk.Combobox):
+    """Combobox con búsqueda: al escribir (con una pausa de DEBOUNCE_MS)
+    muestra debajo las primeras MAX_RESULTS coincidencias, sin importar
+    mayúsculas ni tildes. La lista desplegable solo carga esas mismas filas,
+    no el total. Solo acepta valores de la lista: al salir con un texto que no
+    coincide vuelve al último valor elegido (o vacío).
+
+    `cmb["values"] = lista` o `= PrefixIndex(lista)` cargan las opciones."""
+
+    MAX_RESULTS = 50
+    DEBOUNCE_MS = 120
+    POPUP_ROWS = 8
+
+    def __init__(self, master, **kw):
+        kw["state"] = "normal"
+        values = kw.pop("values", ())
+        super().__init__(master, **kw)
+        self.index = PrefixIndex()
+        self._accepted = ""
+        self._after = None
+        self._popup = None
+        self._list = None
+        self.configure(values=values)
+
+        self.bind("<KeyRelease>", self._on_key, add="+")
+        self.bind("<Down>", lambda _e: self._step(1))
+        self.bind("<Up>", lambda _e: self._step(-1))
+        self.bind("<Return>", self._on_return)
+        self.bind("<Escape>", lambda _e: self._hide())
+        self.bind("<FocusOut>", lambda _e: self.after(150, self._on_blur), add="+")
+        self.bind("<<ComboboxSelected>>", lambda _e: self._remember(), add="+")
+
+    # ---------- opciones ----------
+    def configure(self, cnf=None, **kw):
+        if isinstance(cnf, dict) and "values" in cnf:
+            kw["values"] = cnf.pop("values")
+        if "values" in kw:
+            values = kw.pop("values")
+            self.index = values if isinstance(values, PrefixIndex) else PrefixIndex(values)
+            super().configure(values=self.index.search("", self.MAX_RESULTS))
+            if not kw and not cnf:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def __setitem__(self, key, value):
+        self.configure(**{key: value})
+
+    def set(self, value):
+        self._accepted = value
+        super().set(value)
+
+    def selected_id(self):
+        """Id del valor elegido (None si está vacío o no es de la lista).
+        Un valor puesto con set() vale aunque no esté en la lista (p. ej. el
+        animal ya adoptado de una adopción que se está editando)."""
+        value = self.get()
+        if not value or (value not in self.index and value != self._accepted):
+            return None
+        return int(value.split(" - ")[0])
+
+    # ---------- búsqueda ----------
+    def _on_key(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab",
+                            "Shift_L", "Shift_R", "Control_L", "Control_R"):
+            return
+        if self._after is not None:
+            self.after_cancel(self._after)
+        self._after = self.after(self.DEBOUNCE_MS, self._filter)
+
+    def _filter(self):
+        self._after = None
+        matches = self.index.search(self.get(), self.MAX_RESULTS)
+        super().configure(values=matches)  # lo que muestra la flecha del combo
+        if not matches or not self.get().strip():
+            self._hide()
+            return
+        self._show(matches)
+
+    # ---------- lista emergente ----------
+    def _show(self, matches):
+        if self._popup is None:
+            self._popup = tk.Toplevel(self)
+            self._popup.wm_overrideredirect(True)
+            self._list = tk.Listbox(self._popup, exportselection=False,
+                                    activestyle="none", takefocus=0)
+            self._list.pack(fill="both", expand=True)
+            self._list.bind("<ButtonRelease-1>", lambda _e: self._accept())
+        lst = self._list
+        lst.delete(0, "end")
+        lst.insert("end", *matches)
+        lst.configure(height=min(self.POPUP_ROWS, len(matches)))
+        lst.selection_set(0)
+        self._popup.geometry(f"{self.winfo_width()}x{lst.winfo_reqheight()}"
+                             f"+{self.winfo_rootx()}+{self.winfo_rooty() + self.winfo_height()}")
+        self._popup.deiconify()
+        self._popup.lift()
+
+    def _hide(self):
+        if self._popup is not None:
+            self._popup.withdraw()
+
+    def _visible(self):
+        return self._popup is not None and self._popup.winfo_viewable()
+
+    def _step(self, delta):
+        if not self._visible():
+            return None  # comportamiento normal: abre la lista del combo
+        lst = self._list
+        cur = lst.curselection()
+        i = max(0, min(lst.size() - 1, (cur[0] if cur else -1) + delta))
+        lst.selection_clear(0, "end")
+        lst.selection_set(i)
+        lst.see(i)
+        return "break"
+
+    def _on_return(self, _e):
+        if self._visible():
+            self._accept()
+            return "break"
+        return None
+
+    def _accept(self):
+        cur = self._list.curselection()
+        if cur:
+            self.set(self._list.get(cur[0]))
+            self.icursor("end")
+            self.event_generate("<<ComboboxSelected>>")
+        self._hide()
+
+    def _remember(self):
+        self._accepted = self.get()
+
+    def _on_blur(self):
+        try:
+            focus = self.focus_get()
+        except (KeyError, tk.TclError):
+            focus = None
+        if focus is self or (focus is not None and focus is self._list):
+            return
+        self._hide()
+        value = self.get()
+        if value and value not in self.index:
+            super().set(self._accepted)
+        elif not value:
+            self._accepted = ""
@@ -0,0 +1,266 @@
+# ui/virtual_table.py
+from tkinter import ttk
+
+
+class ListSource:
+    """Fuente de filas sobre una lista en memoria.
+    Cualquier objeto con __len__ y rows(start, stop) sirve como fuente;
+    `fmt` convierte cada fila (p. ej. un sqlite3.Row) en la tupla a mostrar."""
+
+    def __init__(self, rows=(), fmt=tuple):
+        self._rows = rows if isinstance(rows, list) else list(rows)
+        self._fmt = fmt
+
+    def __len__(self):
+        return len(self._rows)
+
+    def rows(self, start, stop):
+        return [self._fmt(r) for r in self._rows[start:stop]]
+
+
+class VirtualTable(ttk.Treeview):
+    """Treeview que solo tiene como ítems las filas que entran en pantalla.
+    Al desplazarse reutiliza esos mismos ítems con los valores de la ventana
+    nueva, así el costo depende del alto de la tabla y no de la cantidad de
+    filas. Se usa igual que un Treeview (heading, column, bind, selection,
+    item) pero los datos se cargan con set_source()/set_rows()."""
+
+    WHEEL_ROWS = 3
+
+    def __init__(self, master, **kw):
+        kw.setdefault("selectmode", "browse")
+        self._yscroll = kw.pop("yscrollcommand", None)
+        super().__init__(master, **kw)
+        self.source = ListSource()
+        self.top = 0            # índice absoluto de la primera fila visible
+        self._iids = []         # ítems reutilizados, en orden de pantalla
+        self._sel = None        # índice absoluto seleccionado
+        self._select_handlers = []
+        self._metrics = None    # (alto encabezado, alto fila) medidos
+
+        super().bind("<<TreeviewSelect>>", self._on_tree_select)
+        super().bind("<Configure>", lambda _e: self._repaint())
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            super().bind(seq, self._on_wheel)
+        for seq, fn in (("<Up>", lambda: self._move(-1)),
+                        ("<Down>", lambda: self._move(1)),
+                        ("<Prior>", lambda: self._move(-self._visible())),
+                        ("<Next>", lambda: self._move(self._visible())),
+                        ("<Home>", lambda: self.select_index(0)),
+                        ("<End>", lambda: self.select_index(len(self.source) - 1))):
+            super().bind(seq, lambda _e, fn=fn: (fn(), "break")[1])
+
+    # ---------- datos ----------
+    def set_source(self, source):
+        """Reemplaza la fuente de filas y vuelve al inicio."""
+        self.source = source
+        self.top = 0
+        self._sel = None
+        self._repaint()
+
+    def set_rows(self, rows, fmt=tuple):
+        self.set_source(ListSource(rows, fmt))
+
+    def row_count(self) -> int:
+        return len(self.source)
+
+    def index_of(self, iid):
+        """Índice absoluto de un ítem visible (None si no es de la tabla)."""
+        try:
+            return self.top + self._iids.index(iid)
+        except ValueError:
+            return None
+
+    def selected_index(self):
+        return self._sel
+
+    # ---------- cambios puntuales (la fuente debe soportarlos) ----------
+    def insert_row(self, row):
+        """Agrega `row` en su posición de orden y la deja a la vista."""
+        if row is None:
+            return
+        self._sel = None
+        self.see_index(self.source.insert(row))
+
+    def update_row(self, index, row):
+        """Reemplaza la fila `index`; si cambió su orden se mueve, y si ya no
+        pasa el filtro (row=None) desaparece."""
+        self._sel = None
+        new = self.source.replace(index, row)
+        if new is None:
+            self._repaint()
+        else:
+            self.see_index(new)
+
+    def delete_row(self, index):
+        self._sel = None
+        self.source.pop(index)
+        self._repaint()
+
+    # ---------- orden por encabezado ----------
+    def sortable(self, columns, on_sort):
+        """Encabezados clicables: on_sort(col) pide los datos en ese orden
+        (el orden lo resuelve la fuente, no la tabla)."""
+        self._titles = {c: self.heading(c, "text") for c in self["columns"]}
+        for c in columns:
+            self.heading(c, command=lambda c=c: on_sort(c))
+
+    def show_sort(self, col, desc):
+        """Marca con ▲/▼ la columna por la que está ordenada la vista."""
+        for c, text in getattr(self, "_titles", {}).items():
+            arrow = (" ▼" if desc else " ▲") if c == col else ""
+            self.heading(c, text=text + arrow)
+
+    # ---------- selección ----------
+    def bind(self, sequence=None, func=None, add=None):
+        # <<TreeviewSelect>> solo se entrega cuando cambia la fila real
+        # (no cuando el desplazamiento reasigna ítems)
+        if sequence == "<<TreeviewSelect>>" and func is not None:
+            if not add:
+                self._select_handlers.clear()
+            self._select_handlers.append(func)
+            return None
+        return super().bind(sequence, func, add)
+
+    def selection_remove(self, *items):
+        self._sel = None
+        return super().selection_remove(*items)
+
+    def selection_set(self, *items):
+        iids = items[0] if len(items) == 1 and isinstance(items[0], (list, tuple)) else items
+        self._sel = self.index_of(iids[0]) if iids else None
+        return super().selection_set(*items)
+
+    def select_index(self, index):
+        """Selecciona la fila absoluta `index`, desplazando si hace falta."""
+        if not len(self.source):
+            return
+        index = max(0, min(index, len(self.source) - 1))
+        self.see_index(index)
+        # el evento llega a _on_tree_select, que notifica el cambio
+        super().selection_set(self._iids[index - self.top])
+
+    def see_index(self, index):
+        vis = self._visible()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + vis:
+            self.top = index - vis + 1
+        self._repaint()
+
+    def _on_tree_select(self, event):
+        sel = super().selection()
+        if not sel:
+            return
+        idx = self.index_of(sel[0])
+        if idx is None or idx == self._sel:
+            return
+        self._sel = idx
+        for fn in self._select_handlers:
+            fn(event)
+
+    def _move(self, delta):
+        base = self._sel if self._sel is not None else self.top - (1 if delta > 0 else 0)
+        self.select_index(base + delta)
+
+    # ---------- desplazamiento ----------
+    def configure(self, cnf=None, **kw):
+        if "yscrollcommand" in kw:
+            self._yscroll = kw.pop("yscrollcommand")
+            self._notify_scroll()
+            if not kw and not cnf:
+                return None
+        return super().configure(cnf, **kw)
+
+    config = configure
+
+    def yview(self, *args):
+        total = len(self.source)
+        if not args:
+            if not total:
+                return 0.0, 1.0
+            return self.top / total, min(1.0, (self.top + self._visible()) / total)
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * total)
+        elif args[0] == "scroll":
+            n = int(args[1])
+            self.top += n * (self._visible() if args[2].startswith("page") else 1)
+        self._repaint()
+        return None
+
+    def _on_wheel(self, event):
+        if event.num == 4:
+            n = -self.WHEEL_ROWS
+        elif event.num == 5:
+            n = self.WHEEL_ROWS
+        else:
+            step = -event.delta // 120 if abs(event.delta) >= 120 else (-1 if event.delta > 0 else 1)
+            n = step * self.WHEEL_ROWS
+        self.yview("scroll", n, "units")
+        return "break"
+
+    def _notify_scroll(self):
+        if self._yscroll is not None:
+            self._yscroll(*self.yview())
+
+    # ---------- render ----------
+    def _measure(self):
+        """(alto del encabezado, alto de fila); se mide con el primer ítem visible."""
+        if self._metrics:
+            return self._metrics
+        if self._iids:
+            box = self.bbox(self._iids[0])
+            if box:
+                self._metrics = (box[1], box[3])
+                return self._metrics
+        style = self.cget("style") or "Treeview"
+        try:
+            row_h = int(ttk.Style().lookup(style, "rowheight") or 20)
+        except (TypeError, ValueError):
+            row_h = 20
+        return 0, row_h
+
+    def _visible(self) -> int:
+        """Filas completas que entran en el alto actual."""
+        header, row_h = self._measure()
+        h = self.winfo_height()
+        if h <= 1:  # aún sin geometría: usa el alto pedido en filas
+            return max(1, int(self.cget("height")))
+        return max(1, (h - header) // row_h)
+
+    def _repaint(self):
+        total = len(self.source)
+        vis = self._visible()
+        self.top = max(0, min(self.top, total - vis))
+        rows = self.source.rows(self.top, min(total, self.top + vis))
+
+        n = len(rows)
+        while len(self._iids) < n:
+            self._iids.append(super().insert("", "end"))
+        if len(self._iids) > n:
+            super().delete(*self._iids[n:])
+            del self._iids[n:]
+
+        for i, (iid, values) in enumerate(zip(self._iids, rows)):
+            tag = "even" if (self.top + i) % 2 == 0 else "odd"
+            super().item(iid, values=values, tags=(tag,))
+
+        # la selección sigue a la fila, no al ítem
+        if self._sel is not None and self.top <= self._sel < self.top + n:
+            iid = self._iids[self._sel - self.top]
+            if super().selection() != (iid,):
+                super().selection_set(iid)
+        elif super().selection():
+            super().selection_set(())
+
+        # el Treeview no debe desplazarse por su cuenta (p. ej. al hacer `see`)
+        self.tk.call(self._w, "yview", "moveto", 0)
+        if self._metrics is None and self._iids:
+            self.after_idle(self._remeasure)
+        self._notify_scroll()
+
+    def _remeasure(self):
+        old = self._measure()
+        self._metrics = None
+        if self._measure() != old:
+            self._repaint()